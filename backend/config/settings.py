@@ -1,24 +1,60 @@
 import os
+from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 
-load_dotenv()
+# config/settings_cache.py is generated by scripts/compile_env.py and holds the parsed .env values.
+try:
+    from config.settings_cache import CACHED_ENV
+except ImportError:
+    CACHED_ENV = {}
 
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-DB_NAME = os.getenv("DB_NAME", "vitafit")
+if not CACHED_ENV and not os.environ.get("VITAFIT_ENV_CACHED"):
+    load_dotenv()
 
-SETTINGS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Process environment variables take precedence over cached .env values, matching load_dotenv().
+ENV = MappingProxyType({**CACHED_ENV, **os.environ})
 
-BACKEND_ROOT = os.path.abspath(os.path.join(SETTINGS_DIR, os.pardir))
+MONGODB_URI = ENV.get("MONGODB_URI", "mongodb://localhost:27017/")
+DB_NAME = ENV.get("DB_NAME", "vitafit")
 
-EXERCISE_MODELS_PATH = os.path.abspath(os.path.join(BACKEND_ROOT, "models", "Exercise_Models"))
-DIET_MODELS_PATH = os.path.abspath(os.path.join(BACKEND_ROOT, "models", "Diet_Recommendation_Models"))
-IMAGE_CLASSIFIER_MODELS_PATH = os.path.abspath(os.path.join(BACKEND_ROOT, "models", "Image_Classifier_Model"))
+MONGODB_MAX_POOL_SIZE = int(ENV.get("MONGODB_MAX_POOL_SIZE", "200"))
+MONGODB_MIN_POOL_SIZE = int(ENV.get("MONGODB_MIN_POOL_SIZE", "10"))
+MONGODB_MAX_IDLE_TIME_MS = int(ENV.get("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(ENV.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+# Comma-separated wire compressors; the server falls back to uncompressed if it supports none of them.
+MONGODB_COMPRESSORS = ENV.get("MONGODB_COMPRESSORS", "zstd")
 
-KNOWLEDGE_BASE_DATA_DIR = os.path.abspath(os.path.join(BACKEND_ROOT, "data"))
-VECTOR_DB_PERSIST_PATH = os.path.abspath(os.path.join(BACKEND_ROOT, "vector_db"))
+PREDICTION_WRITE_MAX_BATCH = int(ENV.get("PREDICTION_WRITE_MAX_BATCH", "500"))
+# Entries per model in the LRU cache of exercise/diet predictions keyed on the exact feature row.
+MODEL_PREDICTION_CACHE_SIZE = int(ENV.get("MODEL_PREDICTION_CACHE_SIZE", "4096"))
+# Concurrent exercise/diet predictions are scored together in batches of up to this many rows.
+MODEL_MAX_BATCH_SIZE = int(ENV.get("MODEL_MAX_BATCH_SIZE", "32"))
+# Threads per onnxruntime session for the exported exercise/diet forests.
+MODEL_ONNX_THREADS = int(ENV.get("MODEL_ONNX_THREADS", "1"))
 
-LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+DISH_MAX_BATCH_SIZE = int(ENV.get("DISH_MAX_BATCH_SIZE", "8"))
+MAX_UPLOAD_BYTES = int(ENV.get("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# When set, /classify_dish is served by one shared inference process at this socket path (see services/dish_worker.py).
+DISH_WORKER_ADDRESS = ENV.get("DISH_WORKER_ADDRESS")
+DISH_WORKER_AUTHKEY = ENV.get("DISH_WORKER_AUTHKEY")
+PRELOAD_IMAGE_CLASSIFIER = ENV.get("PRELOAD_IMAGE_CLASSIFIER", "true").lower() in ("1", "true", "yes")
 
-HF_TOKEN = os.getenv("HF_TOKEN")
+WEB_CONCURRENCY = int(ENV.get("WEB_CONCURRENCY", "1"))
 
-EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-small-en-v1.5")
\ No newline at end of file
+SETTINGS_DIR = Path(__file__).resolve().parent
+
+BACKEND_ROOT = SETTINGS_DIR.parent
+
+EXERCISE_MODELS_PATH = BACKEND_ROOT / "models" / "Exercise_Models"
+DIET_MODELS_PATH = BACKEND_ROOT / "models" / "Diet_Recommendation_Models"
+IMAGE_CLASSIFIER_MODELS_PATH = BACKEND_ROOT / "models" / "Image_Classifier_Model"
+
+KNOWLEDGE_BASE_DATA_DIR = BACKEND_ROOT / "data"
+VECTOR_DB_PERSIST_PATH = BACKEND_ROOT / "vector_db"
+
+LLM_MODEL_NAME = ENV.get("LLM_MODEL_NAME", "TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+
+HF_TOKEN = ENV.get("HF_TOKEN")
+
+EMBEDDING_MODEL_NAME = ENV.get("EMBEDDING_MODEL_NAME", "BAAI/bge-small-en-v1.5")
\ No newline at end of file
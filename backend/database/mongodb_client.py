@@ -1,29 +1,61 @@
 # backend/database/mongodb_client.py
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 from typing import Optional, Any
-from config.settings import MONGODB_URI, DB_NAME
+from config.settings import (
+    MONGODB_URI,
+    DB_NAME,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_MAX_IDLE_TIME_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_COMPRESSORS
+)
 
-mongo_client: Optional[MongoClient] = None
+mongo_client: Optional[AsyncIOMotorClient] = None
 db: Optional[Any] = None
+# Bound once on connect so request handlers don't rebuild the Collection proxy per call.
+# Read it as mongodb_client.predictions_collection; a from-import would capture the initial None.
+predictions_collection: Optional[AsyncIOMotorCollection] = None
 
 async def connect_to_mongodb():
-    global mongo_client, db
+    global mongo_client, db, predictions_collection
     if mongo_client is None:
         try:
-            mongo_client = MongoClient(MONGODB_URI)
+            mongo_client = AsyncIOMotorClient(
+                MONGODB_URI,
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                minPoolSize=MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                retryWrites=True,
+                compressors=MONGODB_COMPRESSORS,
+                appname="vitafit"
+            )
             db = mongo_client[DB_NAME]
-            mongo_client.admin.command('ismaster')
+            predictions_collection = db["predictions"]
+            # 'ping' is the lightweight check; 'ismaster' is deprecated in current MongoDB servers.
+            await mongo_client.admin.command('ping')
             print(f"Connected to MongoDB database: {DB_NAME}")
         except Exception as e:
             print(f"Failed to connect to MongoDB: {e}")
             raise
+        await ensure_indexes()
+
+async def ensure_indexes():
+    """Creates the indexes the endpoints rely on. Safe to call repeatedly; existing indexes are left as is."""
+    try:
+        await predictions_collection.create_index([("session_id", 1)], unique=True, background=True)
+    except Exception as e:
+        print(f"Warning: Could not create unique session_id index on 'predictions': {e}")
 
 async def close_mongodb_connection():
-    global mongo_client
+    global mongo_client, db, predictions_collection
     if mongo_client:
         mongo_client.close()
         mongo_client = None
+        db = None
+        predictions_collection = None
         print("MongoDB connection closed.")
 
 def get_db_collection(collection_name: str):
@@ -0,0 +1,103 @@
+# backend/database/prediction_writer.py
+import asyncio
+from typing import Optional, Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import mongodb_client
+from config.settings import PREDICTION_WRITE_MAX_BATCH
+
+# Prediction updates are queued by the endpoints and written in batches by a single flusher task,
+# so concurrent requests share one bulk_write round-trip instead of each issuing an update_one.
+# The flusher never waits for more updates: it writes whatever is queued as soon as it is free, so a
+# lone update costs one round-trip and updates that arrive during a write go out together in the next.
+# Each queued update carries a future that resolves once its batch is written, so an endpoint can
+# wait for its write and report a failure instead of the update being lost silently.
+_write_queue: Optional[asyncio.Queue] = None
+_flusher_task: Optional[asyncio.Task] = None
+
+def enqueue_prediction_update(session_id: str, update: Dict[str, Any], upsert: bool = False) -> asyncio.Future:
+    """
+    Queues an update for the session's prediction record and returns a future that resolves when
+    it has been written on the next flush, or raises the error that kept it from being written.
+    """
+    done = asyncio.get_running_loop().create_future()
+    if _write_queue is None:
+        done.set_exception(RuntimeError("prediction writer is not running"))
+        return done
+    _write_queue.put_nowait((UpdateOne({"session_id": session_id}, update, upsert=upsert), done))
+    return done
+
+def _resolve(done: asyncio.Future, error: Optional[Exception] = None):
+    # The waiting request may have been cancelled (client disconnect) before the flush finished.
+    if done.done():
+        return
+    if error is None:
+        done.set_result(None)
+    else:
+        done.set_exception(error)
+
+async def _flush(batch: List[Tuple[UpdateOne, asyncio.Future]]):
+    """
+    Writes a batch in queue order. Updates for the same session must apply in the order they
+    were queued (the exercise upsert before the diet $set), so the batch is ordered; if one
+    operation fails, its waiter gets the error and the rest of the batch is retried without it.
+    """
+    predictions_collection = mongodb_client.predictions_collection
+    if predictions_collection is None:
+        print(f"Error storing predictions in MongoDB: connection not established, dropping {len(batch)} update(s).")
+        for _, done in batch:
+            _resolve(done, RuntimeError("MongoDB connection not established"))
+        return
+    while batch:
+        try:
+            result = await predictions_collection.bulk_write([op for op, _ in batch], ordered=True)
+            print(f"Stored {len(batch)} prediction update(s) in MongoDB ({result.upserted_count} new session(s)).")
+            for _, done in batch:
+                _resolve(done)
+            return
+        except BulkWriteError as e:
+            failed = e.details["writeErrors"][0]
+            index = failed["index"]
+            print(f"Error storing predictions in MongoDB: {failed.get('errmsg')}")
+            print(f"Invalid document: {batch[index][0]}")
+            # Ordered writes stop at the first error, so everything before it was applied.
+            for _, done in batch[:index]:
+                _resolve(done)
+            _resolve(batch[index][1], RuntimeError(failed.get("errmsg")))
+            batch = batch[index + 1:]
+        except Exception as e:
+            print(f"Error storing predictions in MongoDB: {e}")
+            for _, done in batch:
+                _resolve(done, e)
+            return
+
+async def _flush_loop():
+    while True:
+        batch = [await _write_queue.get()]
+        while len(batch) < PREDICTION_WRITE_MAX_BATCH and not _write_queue.empty():
+            batch.append(_write_queue.get_nowait())
+        await _flush(batch)
+
+def start_prediction_writer():
+    global _write_queue, _flusher_task
+    if _flusher_task is None:
+        _write_queue = asyncio.Queue()
+        _flusher_task = asyncio.create_task(_flush_loop())
+
+async def stop_prediction_writer():
+    """Stops the flusher and writes whatever is still queued."""
+    global _write_queue, _flusher_task
+    if _flusher_task is None:
+        return
+    _flusher_task.cancel()
+    try:
+        await _flusher_task
+    except asyncio.CancelledError:
+        pass
+    pending = []
+    while not _write_queue.empty():
+        pending.append(_write_queue.get_nowait())
+    if pending:
+        await _flush(pending)
+    _write_queue = None
+    _flusher_task = None
@@ -1,31 +1,59 @@
 # backend/main.py
-import os
+import sys
+import asyncio
 import uuid
-import datetime
+from time import time as _now
 import json
+from contextlib import asynccontextmanager
 from typing import Optional, Any
 from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+import cv2
+import numpy as np
 from PIL import Image
 import io
-from config.settings import DB_NAME, IMAGE_CLASSIFIER_MODELS_PATH 
-from database.mongodb_client import connect_to_mongodb, close_mongodb_connection, get_db_collection
+from config.settings import (
+    DB_NAME, IMAGE_CLASSIFIER_MODELS_PATH, MAX_UPLOAD_BYTES,
+    PRELOAD_IMAGE_CLASSIFIER, WEB_CONCURRENCY, DISH_WORKER_ADDRESS, DISH_WORKER_AUTHKEY
+)
+from database import mongodb_client
+from database.mongodb_client import connect_to_mongodb, close_mongodb_connection
+from database.prediction_writer import start_prediction_writer, stop_prediction_writer, enqueue_prediction_update
 from models.request_models import UserInput, UserPersonalDetails, ReportRequest, DietPlanRequest, ChatRequest
-from services.exercise_service import load_exercise_models, predict_exercise
-from services.diet_service import load_diet_models, predict_diet
+from services.exercise_service import load_exercise_models_sync, predict_exercise, warm_exercise_models, exercise_batcher
+from services.diet_service import load_diet_models_sync, predict_diet, warm_diet_models, diet_batcher
 from services.report_service import generate_report as generate_pdf_report
-from models.Image_Classifier_Model.image_classifier_logic import ImageClassifier, DetectionResponse
-from utils.helpers import convert_numpy_types
+from services.dish_service import start_dish_batcher, stop_dish_batcher, classify_dish
+from services.dish_worker import RemoteImageClassifier, start_dish_worker_process, stop_dish_worker_process
+from models.Image_Classifier_Model.image_classifier_logic import ImageClassifier, DetectionResponse, YOLO_IMAGE_SIZE
+from utils.upload_limits import UploadLimitMiddleware
+from utils.helpers import compute_input_hash, release_freed_heap
 from services.rag_service import RAGAssistant, load_rag_knowledge_base, initialize_rag_components 
 
+# --- Application Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Runs startup before the app serves requests and shutdown once it stops."""
+    await startup_all(app)
+    try:
+        yield
+    finally:
+        await shutdown_all(app)
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="Fitness and Diet Prediction API",
     description="API for predicting exercise and diet plans based on user data, and dish image classification, and AI-powered health overview.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Turns away non-multipart and oversized uploads before the body is read or a handler is scheduled.
+# Registered before CORS so CORS wraps it and its rejections still reach the browser with CORS headers.
+app.add_middleware(UploadLimitMiddleware, paths=["/classify_dish"], max_upload_bytes=MAX_UPLOAD_BYTES)
+
 # --- CORS Middleware ---
 app.add_middleware(
     CORSMiddleware,
@@ -35,18 +63,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-image_classifier_model: Optional[ImageClassifier] = None
 rag_assistant_instance: Optional[RAGAssistant] = None
 knowledge_base_instance: Any = None 
 
-# --- Startup Events ---
-@app.on_event("startup")
-async def startup_all():
+# The RAG assistant is an optional feature and is loaded on first use. The dish classifier is loaded
+# at startup unless PRELOAD_IMAGE_CLASSIFIER is off, in which case /classify_dish loads it lazily.
+_image_classifier_lock = asyncio.Lock()
+_rag_assistant_lock = asyncio.Lock()
+
+# Field /predict_exercise compares to skip rewriting an unchanged record.
+_INPUT_HASH_PROJECTION = {"input_hash": 1, "_id": 0}
+# Fields /predict_diet needs from a stored record.
+_DIET_INPUT_PROJECTION = {"processed_features": 1, "exercise_predictions": 1, "raw_user_input": 1, "_id": 0}
+# Fields left out of the record handed to the LLM for /ai/overview: internal ids, encoded features and write bookkeeping.
+_OVERVIEW_EXCLUDED_PROJECTION = {
+    "_id": 0, "timestamp": 0, "processed_features": 0, "input_hash": 0, "created_at": 0, "last_updated": 0
+}
+
+YOLO_MODEL_FILE_NAME = "image_classification.pt"
+FULL_YOLO_MODEL_PATH = str(IMAGE_CLASSIFIER_MODELS_PATH / YOLO_MODEL_FILE_NAME)
+
+# --- Startup / Shutdown ---
+async def startup_all(app: FastAPI):
     """
     Handles all necessary startup procedures:
     1. Connect to MongoDB.
-    2. Load Machine Learning Models (Exercise, Diet, Image Classifier).
-    3. Initialize RAG components (Knowledge Base, LLM, Retriever).
+    2. Load Machine Learning Models (Exercise, Diet and, if preloading is enabled, the image classifier).
+    The RAG components are loaded lazily by their endpoints.
     """
     # 1. Connect to MongoDB
     try:
@@ -55,106 +98,165 @@ async def startup_all():
     except Exception as e:
         print(f"Application startup failed due to MongoDB connection error: {e}")
         raise HTTPException(status_code=500, detail=f"Server startup error: Failed to connect to MongoDB. {e}")
-
-    # 2. Load Machine Learning Models
-    try:
-        await load_exercise_models()
-        print("Exercise models loaded successfully!")
-        await load_diet_models()
-        print("Diet models loaded successfully!")
-        
-        global image_classifier_model
-        yolo_model_file_name = "image_classification.pt"
-        full_yolo_model_path = os.path.join(IMAGE_CLASSIFIER_MODELS_PATH, yolo_model_file_name)
-        
+    # Handlers read the collection from app.state, which also lets tests substitute their own.
+    app.state.predictions = mongodb_client.predictions_collection
+    start_prediction_writer()
+    start_dish_batcher()
+    exercise_batcher.start()
+    diet_batcher.start()
+
+    # 2. Load Machine Learning Models concurrently
+    app.state.image_classifier = None
+    loaders = [asyncio.to_thread(load_exercise_models_sync), asyncio.to_thread(load_diet_models_sync)]
+    if PRELOAD_IMAGE_CLASSIFIER:
+        loaders.append(asyncio.to_thread(_load_image_classifier, FULL_YOLO_MODEL_PATH))
+
+    exercise_result, diet_result, *image_classifier_result = await asyncio.gather(*loaders, return_exceptions=True)
+
+    for model_name, result in (("Exercise", exercise_result), ("Diet", diet_result)):
+        if isinstance(result, HTTPException):
+            raise result
+        if isinstance(result, Exception):
+            print(f"An unexpected error occurred during {model_name.lower()} model loading: {result}")
+            raise HTTPException(status_code=500, detail=f"Server startup error: Failed to load ML models. {result}")
+        print(f"{model_name} models loaded successfully!")
+
+    if image_classifier_result and not isinstance(image_classifier_result[0], BaseException):
+        app.state.image_classifier = image_classifier_result[0]
+
+    # Run one prediction per model now rather than during the first /predict_exercise and /predict_diet.
+    await asyncio.to_thread(_warm_models)
+
+
+def _warm_models():
+    warm_exercise_models()
+    warm_diet_models()
+    # Every worker loads its own copy of the models, so drop the load-time garbage from each one's RSS.
+    release_freed_heap()
+
+
+def _load_image_classifier(model_path: str) -> Optional[ImageClassifier]:
+    """Loads the dish classifier; failures are logged and leave the endpoint unavailable."""
+    if DISH_WORKER_ADDRESS:
         try:
-            image_classifier_model = ImageClassifier(model_path=full_yolo_model_path)
-            if image_classifier_model.yolo_model is None:
-                raise RuntimeError("YOLO model did not load correctly within ImageClassifier.")
-            print(f"Image classifier model loaded successfully from {full_yolo_model_path}!")
+            classifier = RemoteImageClassifier(DISH_WORKER_ADDRESS, DISH_WORKER_AUTHKEY or "")
+            print(f"Connected to dish inference worker at {DISH_WORKER_ADDRESS}.")
+            return classifier
         except Exception as e:
-            print(f"Error loading image classifier model: {e}")
-            image_classifier_model = None 
+            print(f"Error connecting to dish inference worker at {DISH_WORKER_ADDRESS}: {e}")
             print("Warning: Image classification endpoint will not be available.")
+            return None
 
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        print(f"An unexpected error occurred during ML model loading: {e}")
-        raise HTTPException(status_code=500, detail=f"Server startup error: Failed to load ML models. {e}")
-
-    # --- NEW: 3. Initialize RAG Components ---
-    global knowledge_base_instance, rag_assistant_instance 
     try:
-        knowledge_base_instance = await load_rag_knowledge_base() 
-        rag_assistant_instance = await initialize_rag_components(knowledge_base=knowledge_base_instance)
-        print("RAG Assistant components loaded successfully!")
+        classifier = ImageClassifier(model_path=model_path)
+        if not classifier.is_loaded:
+            raise RuntimeError("YOLO model did not load correctly within ImageClassifier.")
+        classifier.warmup()
+        print(f"Image classifier model loaded successfully from {model_path}!")
+        return classifier
     except Exception as e:
-        print(f"FATAL ERROR: Error initializing RAG Assistant: {e}")
-        rag_assistant_instance = None 
-        knowledge_base_instance = None 
-        raise HTTPException(status_code=500, detail=f"Server startup error: Failed to initialize AI services. {e}")
-
-
-@app.on_event("shutdown")
-async def shutdown_all():
-    """Closes all necessary connections on application shutdown."""
+        print(f"Error loading image classifier model: {e}")
+        print("Warning: Image classification endpoint will not be available.")
+        return None
+
+
+async def get_image_classifier(app: FastAPI) -> Optional[ImageClassifier]:
+    """Returns the dish classifier from app.state, loading it in a worker thread if startup did not."""
+    if app.state.image_classifier is None:
+        async with _image_classifier_lock:
+            if app.state.image_classifier is None:
+                app.state.image_classifier = await asyncio.to_thread(_load_image_classifier, FULL_YOLO_MODEL_PATH)
+    return app.state.image_classifier
+
+
+async def shutdown_all(app: FastAPI):
+    """Flushes queued prediction writes and closes all necessary connections on application shutdown."""
+    await stop_dish_batcher()
+    await exercise_batcher.stop()
+    await diet_batcher.stop()
+    await stop_prediction_writer()
     await close_mongodb_connection()
+    app.state.predictions = None
     print("Disconnected from MongoDB.")
 
 # --- Dependency to get the RAG Assistant instance ---
 async def get_rag_assistant_dependency():
+    """Returns the RAG assistant, initializing the knowledge base and LLMs on first use."""
+    global knowledge_base_instance, rag_assistant_instance
     if rag_assistant_instance is None:
-        raise HTTPException(status_code=503, detail="AI services are not initialized or failed to load during startup.")
+        async with _rag_assistant_lock:
+            if rag_assistant_instance is None:
+                try:
+                    knowledge_base_instance = await load_rag_knowledge_base()
+                    rag_assistant_instance = await initialize_rag_components(knowledge_base=knowledge_base_instance)
+                    print("RAG Assistant components loaded successfully!")
+                except Exception as e:
+                    print(f"Error initializing RAG Assistant: {e}")
+                    rag_assistant_instance = None
+                    knowledge_base_instance = None
+                    raise HTTPException(status_code=503, detail=f"AI services failed to initialize: {e}")
     return rag_assistant_instance
 
 # --- API Endpoints ---
 
+# The welcome payload never changes, so it is encoded once and served with a cache header.
+ROOT_RESPONSE = ORJSONResponse(
+    {"message": "Welcome to the Fitness and Diet Prediction API!"},
+    headers={"Cache-Control": "public, max-age=3600"}
+)
+
 @app.get("/")
 async def read_root():
-    return {"message": "Welcome to the Fitness and Diet Prediction API!"}
+    return ROOT_RESPONSE
 
 @app.post("/predict_exercise")
-async def predict_exercise_plan_endpoint(user_input: UserInput):
-    predictions_collection = get_db_collection("predictions")
-    exercise_predictions = predict_exercise(user_input)
+async def predict_exercise_plan_endpoint(request: Request, user_input: UserInput):
+    # UserInput fields are plain str/int/float, so pydantic can emit JSON-safe values without a conversion pass.
+    raw_user_input = user_input.model_dump(mode="json")
+    input_hash = compute_input_hash(raw_user_input)
+    # The stored hash is read while the models run, so the unchanged-input check adds no latency of its own.
+    (exercise_predictions, processed_core_features), stored = await asyncio.gather(
+        predict_exercise(user_input),
+        request.app.state.predictions.find_one({"session_id": user_input.session_id}, projection=_INPUT_HASH_PROJECTION)
+    )
     prediction_record = {
         "session_id": user_input.session_id,
-        "timestamp": datetime.datetime.utcnow(),
-        "raw_user_input": convert_numpy_types(user_input.dict()),
-        "processed_features": None,
-        "exercise_predictions": convert_numpy_types(exercise_predictions),
+        "timestamp": int(_now() * 1000),
+        "input_hash": input_hash,
+        "raw_user_input": raw_user_input,
+        "processed_features": processed_core_features,
+        "exercise_predictions": exercise_predictions,
         "diet_predictions": {}
     }
-    from services.exercise_service import preprocess_user_data_for_exercise, label_encoders as exercise_label_encoders
-    if exercise_label_encoders is None:
-          raise HTTPException(status_code=500, detail="Exercise label encoders not loaded during initial startup.")
-    
-    _, processed_core_features = preprocess_user_data_for_exercise(user_input)
-    prediction_record["processed_features"] = convert_numpy_types(processed_core_features)
 
-    try:
-        predictions_collection.update_one(
-            {"session_id": user_input.session_id},
-            {"$set": prediction_record},
-            upsert=True
-        )
-        print(f"Exercise predictions for session {user_input.session_id} stored/updated in MongoDB.")
-    except Exception as e:
-        print(f"Error storing exercise predictions in MongoDB: {e}")
-        print(f"Invalid document: {prediction_record}")
-        raise HTTPException(status_code=500, detail=f"Failed to store exercise predictions in database: {e}")
+    # Resubmitting the input already stored for the session leaves the record (and its diet plan) as is.
+    # The check reads MongoDB rather than a per-process cache, so it sees records written by any worker.
+    if stored and stored.get("input_hash") == input_hash:
+        print(f"Exercise input for session {user_input.session_id} unchanged; skipping MongoDB write.")
+    else:
+        # Waiting for the flush surfaces a failed write to the client.
+        try:
+            await enqueue_prediction_update(
+                user_input.session_id,
+                {"$set": prediction_record, "$setOnInsert": {"created_at": prediction_record["timestamp"]}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error storing exercise predictions in MongoDB: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to store exercise predictions in database: {e}")
 
-    return {
+    # The payload is already JSON-safe, so skip FastAPI's jsonable_encoder pass.
+    return ORJSONResponse(content={
         "session_id": user_input.session_id,
         "exercise_plan": exercise_predictions,
         "message": "Exercise plan generated. You can now generate a diet plan with more details if desired."
-    }
+    })
 
 @app.post("/predict_diet")
-async def predict_diet_plan_endpoint(diet_request: DietPlanRequest):
-    predictions_collection = get_db_collection("predictions")
-    prediction_record = predictions_collection.find_one({"session_id": diet_request.session_id})
+async def predict_diet_plan_endpoint(request: Request, diet_request: DietPlanRequest):
+    predictions_collection = request.app.state.predictions
+    # Any worker may have stored the session's latest input, so it is read from MongoDB rather than cached per process.
+    prediction_record = await predictions_collection.find_one({"session_id": diet_request.session_id}, projection=_DIET_INPUT_PROJECTION)
 
     if not prediction_record:
         raise HTTPException(status_code=404, detail=f"No exercise predictions found for session ID: {diet_request.session_id}. Please submit initial user data first.")
@@ -166,61 +268,104 @@ async def predict_diet_plan_endpoint(diet_request: DietPlanRequest):
     if not processed_core_features or not exercise_predictions:
         raise HTTPException(status_code=500, detail="Incomplete stored data for session. Cannot generate diet plan.")
 
-    diet_predictions = predict_diet(processed_core_features, exercise_predictions, raw_user_input)
+    diet_predictions = await predict_diet(processed_core_features, exercise_predictions, raw_user_input)
 
     try:
-        predictions_collection.update_one(
-            {"session_id": diet_request.session_id},
+        await enqueue_prediction_update(
+            diet_request.session_id,
             {"$set": {
-                "diet_predictions": convert_numpy_types(diet_predictions),
-                "last_updated": datetime.datetime.utcnow()
+                "diet_predictions": diet_predictions,
+                "last_updated": int(_now() * 1000)
             }}
         )
-        print(f"Diet predictions for session {diet_request.session_id} updated in MongoDB.")
     except Exception as e:
         print(f"Error updating diet predictions in MongoDB: {e}")
-        print(f"Invalid diet document for update: {convert_numpy_types(diet_predictions)}")
         raise HTTPException(status_code=500, detail=f"Failed to update diet predictions in database: {e}")
 
-    return {
+    return ORJSONResponse(content={
         "session_id": diet_request.session_id,
         "diet_plan": diet_predictions,
         "message": "Diet plan generated successfully!"
-    }
+    })
 
-@app.post("/generate_report", response_class=StreamingResponse)
-async def generate_report_endpoint(report_request: ReportRequest):
-    return await generate_pdf_report(report_request)
+@app.post("/generate_report", response_class=Response)
+async def generate_report_endpoint(request: Request, report_request: ReportRequest):
+    return await generate_pdf_report(report_request, request.app.state.predictions)
 
 @app.post("/classify_dish", response_model=DetectionResponse)
-async def classify_dish_endpoint(file: UploadFile = File(...)):
+async def classify_dish_endpoint(request: Request, file: UploadFile = File(...)):
+    image_classifier_model = await get_image_classifier(request.app)
     if image_classifier_model is None:
         raise HTTPException(status_code=500, detail="Dish detection model is not loaded or available.")
 
+    # The part's own content type is only known once the multipart body is parsed; size is checked by UploadLimitMiddleware.
     if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
+        raise HTTPException(status_code=415, detail="Invalid file type. Please upload an image.")
+
+    try:
+        # OpenCV releases the GIL while decoding, so a large photo doesn't stall the event loop.
+        img, original_size = await asyncio.to_thread(_decode_upload, file.file)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode the uploaded image: {str(e)}")
 
     try:
-        image_bytes = await file.read()
-        detection_response = image_classifier_model.predict_dish_from_image(image_bytes)
+        detection_response = await classify_dish(image_classifier_model, img)
+        height, width = img.shape[:2]
+        if (width, height) != original_size:
+            _rescale_detection_boxes(detection_response, original_size[0] / width, original_size[1] / height)
         return detection_response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dish detection failed: {str(e)}")
 
+# cv2.imdecode flags that have libjpeg decode a JPEG at 1/scale. EXIF orientation is ignored, as it always has been.
+_JPEG_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def _decode_upload(fileobj) -> tuple:
+    """
+    Decodes an uploaded image into the HxWx3 BGR array YOLO takes, returning it together with its original (width, height).
+    cv2 decodes straight into the array, so there is no intermediate PIL image to copy the pixels out of.
+    """
+    # Pillow only parses the header here, to get the size and format without decoding.
+    with Image.open(fileobj) as header:
+        original_size, image_format = header.size, header.format
+    fileobj.seek(0)
+    data = np.frombuffer(fileobj.read(), dtype=np.uint8)
+
+    flags = cv2.IMREAD_COLOR
+    if image_format == "JPEG":
+        # Decode at the smallest 1/2^n scale that still covers the model input (what PIL's draft mode picks).
+        fits = min(original_size[0] // YOLO_IMAGE_SIZE, original_size[1] // YOLO_IMAGE_SIZE)
+        flags = _JPEG_REDUCED_DECODE_FLAGS[max((s for s in _JPEG_REDUCED_DECODE_FLAGS if s <= fits), default=1)]
+    img = cv2.imdecode(data, flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        # Formats OpenCV can't read (e.g. GIF) still go through Pillow.
+        fileobj.seek(0)
+        with Image.open(fileobj) as pil_img:
+            img = cv2.cvtColor(np.asarray(pil_img.convert("RGB")), cv2.COLOR_RGB2BGR)
+    return img, original_size
+
+def _rescale_detection_boxes(detection_response: DetectionResponse, scale_x: float, scale_y: float):
+    """Maps boxes from a draft-decoded image back to the pixel coordinates of the uploaded image."""
+    for detection in detection_response.detections:
+        x1, y1, x2, y2 = detection.box
+        detection.box = [round(x1 * scale_x), round(y1 * scale_y), round(x2 * scale_x), round(y2 * scale_y)]
+
 @app.post("/ai/overview")
-async def get_ai_overview_endpoint(chat_request: ChatRequest, rag: RAGAssistant = Depends(get_rag_assistant_dependency)):
-    predictions_collection = get_db_collection("predictions")
+async def get_ai_overview_endpoint(request: Request, chat_request: ChatRequest, rag: RAGAssistant = Depends(get_rag_assistant_dependency)):
+    predictions_collection = request.app.state.predictions
     session_id = chat_request.session_id
 
-    user_data_record = predictions_collection.find_one({"session_id": session_id})
+    # Let the server drop the fields the LLM doesn't need instead of filtering them out here.
+    user_data_for_llm = await predictions_collection.find_one({"session_id": session_id}, projection=_OVERVIEW_EXCLUDED_PROJECTION)
 
-    if not user_data_record:
+    if not user_data_for_llm:
         raise HTTPException(status_code=404, detail=f"No fitness data found for session ID: {session_id}. Please submit your personal details and generate a plan first.")
 
-    user_data_for_llm = {
-        k: v for k, v in user_data_record.items() 
-        if k not in ["_id", "timestamp", "processed_features"]
-    }
     user_data_context_str = json.dumps(user_data_for_llm, indent=2)
 
     try:
@@ -243,4 +388,27 @@ async def ai_chat_endpoint(chat_request: ChatRequest, rag: RAGAssistant = Depend
         return {"response": response}
     except Exception as e:
         print(f"Error processing AI chat message for session {session_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process AI chat message: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process AI chat message: {str(e)}")
+
+if __name__ == "__main__":
+    import uvicorn
+    # Start the shared dish worker before the web workers so they only connect to it instead of
+    # each loading YOLO; every other model is still loaded per worker by the lifespan.
+    dish_worker_process = None
+    if DISH_WORKER_ADDRESS:
+        if not DISH_WORKER_AUTHKEY:
+            raise SystemExit("DISH_WORKER_AUTHKEY must be set when DISH_WORKER_ADDRESS is used.")
+        dish_worker_process = start_dish_worker_process(DISH_WORKER_ADDRESS, DISH_WORKER_AUTHKEY)
+    try:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=WEB_CONCURRENCY,
+            loop="asyncio" if sys.platform == "win32" else "uvloop",
+            http="httptools"
+        )
+    finally:
+        # The web workers have shut down by now, so nothing is still sending images to the worker.
+        if dish_worker_process is not None:
+            stop_dish_worker_process(dish_worker_process)
@@ -0,0 +1,112 @@
+# backend/models/Image_Classifier_Model/onnx_detector.py
+"""
+Runs the exported YOLO dish detector through onnxruntime.
+
+Pre- and post-processing mirror what Ultralytics does for the PyTorch checkpoint (rectangular
+letterbox, class-aware NMS, rescaling to the source image), so both backends return the same boxes.
+"""
+import ast
+import cv2
+import numpy as np
+import onnxruntime as ort
+import torch
+import torchvision
+from typing import List, Dict
+
+PREFERRED_PROVIDERS = ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"]
+LETTERBOX_FILL = 114
+MAX_DETECTIONS = 300
+MAX_NMS_CANDIDATES = 30000
+# Offset added per class before NMS so boxes of different classes never suppress each other.
+CLASS_OFFSET = 7680
+
+
+class OnnxDetector:
+    def __init__(self, onnx_path: str, imgsz: int):
+        available = ort.get_available_providers()
+        providers = [p for p in PREFERRED_PROVIDERS if p in available]
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.imgsz = imgsz
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names: Dict[int, str] = ast.literal_eval(metadata["names"])
+        self.stride = int(metadata.get("stride", 32))
+        # A static export only accepts its fixed square input; a dynamic one takes the minimal rectangle.
+        self.dynamic = bool(ast.literal_eval(metadata.get("args", "{}")).get("dynamic", False))
+        print(f"ONNX dish detector loaded from {onnx_path} with providers {self.session.get_providers()}")
+
+    def _letterbox(self, img: np.ndarray) -> np.ndarray:
+        h, w = img.shape[:2]
+        r = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * r)), int(round(h * r))
+        dw, dh = self.imgsz - new_w, self.imgsz - new_h
+        if self.dynamic:
+            dw, dh = dw % self.stride, dh % self.stride
+        dw, dh = dw / 2, dh / 2
+
+        if (w, h) != (new_w, new_h):
+            img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        return cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(LETTERBOX_FILL,) * 3)
+
+    def _scale_boxes(self, boxes: np.ndarray, input_shape: tuple, image_shape: tuple) -> np.ndarray:
+        gain = min(input_shape[0] / image_shape[0], input_shape[1] / image_shape[1])
+        pad_x = round((input_shape[1] - image_shape[1] * gain) / 2 - 0.1)
+        pad_y = round((input_shape[0] - image_shape[0] * gain) / 2 - 0.1)
+        boxes[:, [0, 2]] -= pad_x
+        boxes[:, [1, 3]] -= pad_y
+        boxes /= gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+        return boxes
+
+    def _nms(self, pred: np.ndarray, conf: float, iou: float) -> np.ndarray:
+        """Filters one image's raw (4 + num_classes, N) output down to (n, 6) rows of x1, y1, x2, y2, conf, cls."""
+        pred = pred.T
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        xywh, confidences, class_ids = pred[keep, :4], confidences[keep], class_ids[keep]
+
+        if len(confidences) > MAX_NMS_CANDIDATES:
+            top = confidences.argsort()[::-1][:MAX_NMS_CANDIDATES]
+            xywh, confidences, class_ids = xywh[top], confidences[top], class_ids[top]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        class_ids = class_ids.astype(np.float32)
+        offset_boxes = boxes + class_ids[:, None] * CLASS_OFFSET
+        kept = torchvision.ops.nms(torch.from_numpy(offset_boxes), torch.from_numpy(confidences), iou).numpy()[:MAX_DETECTIONS]
+        return np.concatenate([boxes[kept], confidences[kept, None], class_ids[kept, None]], axis=1)
+
+    def preprocess(self, arrays: List[np.ndarray]) -> np.ndarray:
+        """Letterboxes same-sized BGR arrays into one normalized RGB NCHW batch for the session."""
+        # The channel flip is a view; the contiguous copy below is needed for the dtype cast anyway.
+        batch = np.stack([self._letterbox(a) for a in arrays]).transpose(0, 3, 1, 2)[:, ::-1]
+        return np.ascontiguousarray(batch, dtype=self.input_dtype) / self.input_dtype(255)
+
+    def predict(self, arrays: List[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        """
+        Detects dishes in same-sized HxWx3 BGR uint8 images in a single session.run call.
+        Returns one (n, 6) array of x1, y1, x2, y2, conf, cls per image, in source pixel coordinates.
+        """
+        batch = self.preprocess(arrays)
+
+        preds = self.session.run(None, {self.input_name: batch})[0].astype(np.float32)
+
+        detections = []
+        for pred, array in zip(preds, arrays):
+            det = self._nms(pred, conf, iou)
+            det[:, :4] = self._scale_boxes(det[:, :4], batch.shape[2:], array.shape[:2])
+            detections.append(det)
+        return detections
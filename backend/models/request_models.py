@@ -1,8 +1,12 @@
 # backend/models/request_models.py
 from typing import Optional, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-class UserInput(BaseModel):
+class RequestModel(BaseModel):
+    """Base for request bodies: immutable once parsed, unknown fields dropped, strings trimmed."""
+    model_config = ConfigDict(frozen=True, extra='ignore', str_strip_whitespace=True)
+
+class UserInput(RequestModel):
     session_id: str = Field(..., description="Unique session ID from frontend to track user's predictions.")
     age: int = Field(..., gt=0, lt=120, description="User's age in years.")
     gender: Literal["male", "female"] = Field(..., description="User's gender.")
@@ -13,19 +17,19 @@ class UserInput(BaseModel):
     calories_intake: int = Field(..., gt=0, description="User's daily calorie intake.")
 
 
-class UserPersonalDetails(BaseModel):
+class UserPersonalDetails(RequestModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     email: Optional[str] = None
     phone: Optional[str] = None
 
-class ReportRequest(BaseModel):
+class ReportRequest(RequestModel):
     session_id: str = Field(..., description="Session ID to retrieve stored predictions.")
     user_details: Optional[UserPersonalDetails] = None
 
-class DietPlanRequest(BaseModel):
+class DietPlanRequest(RequestModel):
     session_id: str = Field(..., description="Session ID to retrieve previous exercise predictions and user data.")
 
-class ChatRequest(BaseModel):
+class ChatRequest(RequestModel):
     session_id: str
     message: str
\ No newline at end of file
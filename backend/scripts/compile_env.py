@@ -0,0 +1,31 @@
+# backend/scripts/compile_env.py
+"""
+Parses backend/.env once and writes the values to config/settings_cache.py as Python literals,
+so worker processes import them instead of re-parsing the .env file on every start.
+
+Run from the backend directory: python scripts/compile_env.py
+Re-run it whenever .env changes.
+"""
+import os
+from dotenv import dotenv_values
+
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+ENV_FILE = os.path.join(BACKEND_ROOT, ".env")
+CACHE_FILE = os.path.join(BACKEND_ROOT, "config", "settings_cache.py")
+
+
+def compile_env(env_file: str = ENV_FILE, cache_file: str = CACHE_FILE) -> None:
+    values = {k: v for k, v in dotenv_values(env_file).items() if v is not None}
+    lines = [
+        "# Generated by scripts/compile_env.py from .env. Do not edit or commit.",
+        "CACHED_ENV = {"
+    ]
+    lines.extend(f"    {key!r}: {value!r}," for key, value in sorted(values.items()))
+    lines.append("}")
+    with open(cache_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"Wrote {len(values)} settings from {env_file} to {cache_file}")
+
+
+if __name__ == "__main__":
+    compile_env()
@@ -0,0 +1,28 @@
+# backend/scripts/export_models.py
+"""
+Exports the scikit-learn model pickles to safetensors + JSON manifests.
+The services load these exports in preference to the pickles when they are present.
+
+Run from the backend directory: python scripts/export_models.py
+"""
+import os
+import sys
+import glob
+import joblib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from config.settings import EXERCISE_MODELS_PATH, DIET_MODELS_PATH
+from utils.model_serialization import save_model, TENSORS_SUFFIX
+
+
+def export_model(pickle_path: str) -> None:
+    path_stem = os.path.splitext(pickle_path)[0]
+    save_model(joblib.load(pickle_path), path_stem)
+    print(f"Exported {pickle_path} -> {path_stem}{TENSORS_SUFFIX}")
+
+
+if __name__ == "__main__":
+    for models_path in (EXERCISE_MODELS_PATH, DIET_MODELS_PATH):
+        for model_file in sorted(glob.glob(os.path.join(models_path, "*.pkl"))):
+            export_model(model_file)
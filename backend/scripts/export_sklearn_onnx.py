@@ -0,0 +1,61 @@
+# backend/scripts/export_sklearn_onnx.py
+"""
+Exports the scikit-learn exercise and diet forests to ONNX next to their pickles (e.g. multi_classifier.onnx),
+plus an ORT-format copy (multi_classifier.ort) that onnxruntime loads faster and with far less memory.
+The services serve these exports through onnxruntime in preference to the sklearn models when they are present.
+Re-run it after upgrading onnxruntime, since the .ort files are written by the installed version.
+
+Run from the backend directory: python scripts/export_sklearn_onnx.py
+"""
+import os
+import sys
+import joblib
+import onnxruntime as ort
+from sklearn.base import is_classifier
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from config.settings import EXERCISE_MODELS_PATH, DIET_MODELS_PATH
+from utils.model_serialization import ONNX_SUFFIX, ORT_SUFFIX, PICKLE_SUFFIX
+
+MODELS = [
+    (EXERCISE_MODELS_PATH, "multi_classifier"),
+    (EXERCISE_MODELS_PATH, "multi_regressor"),
+    (DIET_MODELS_PATH, "diet_model_rf"),
+]
+# onnxruntime 1.22 implements ai.onnx.ml up to opset 5; opset 3 is all the tree ensembles need.
+TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+
+def export_model(models_path: str, name: str) -> None:
+    path_stem = os.path.join(models_path, name)
+    model = joblib.load(path_stem + PICKLE_SUFFIX)
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, model.n_features_in_]))],
+        target_opset=TARGET_OPSET,
+        # Return probabilities as a plain tensor rather than a list of per-row dicts.
+        options={"zipmap": False} if is_classifier(model) else None,
+    )
+    with open(path_stem + ONNX_SUFFIX, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"Exported {path_stem}{PICKLE_SUFFIX} -> {path_stem}{ONNX_SUFFIX}")
+    export_ort_format(path_stem)
+
+
+def export_ort_format(path_stem: str) -> None:
+    """Re-saves the ONNX export in ORT format, which skips protobuf parsing and graph optimization at load."""
+    session_options = ort.SessionOptions()
+    # Basic optimizations only, so the saved graph carries no CPU-specific kernels.
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    session_options.optimized_model_filepath = path_stem + ORT_SUFFIX
+    session_options.add_session_config_entry("session.save_model_format", "ORT")
+    ort.InferenceSession(path_stem + ONNX_SUFFIX, session_options, providers=["CPUExecutionProvider"])
+    print(f"Exported {path_stem}{ONNX_SUFFIX} -> {path_stem}{ORT_SUFFIX}")
+
+
+if __name__ == "__main__":
+    for models_path, name in MODELS:
+        export_model(models_path, name)
@@ -0,0 +1,113 @@
+# backend/scripts/export_yolo_onnx.py
+"""
+Exports the YOLO dish detector to ONNX next to its checkpoint (image_classification.onnx).
+
+With --int8 DIR the float export is also statically quantized to INT8 (image_classification.int8.onnx),
+calibrated on the dish photos in DIR. Check its detections on your own images before deploying it.
+
+ImageClassifier loads the first of these that exists and loads cleanly, on any host: the INT8 export,
+then the float export (both through onnxruntime), then the PyTorch checkpoint.
+
+Run from the backend directory: python scripts/export_yolo_onnx.py [--int8 path/to/calibration/images]
+"""
+import os
+import sys
+import argparse
+import cv2
+import onnx
+import torch
+from ultralytics import YOLO
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from config.settings import IMAGE_CLASSIFIER_MODELS_PATH
+from models.Image_Classifier_Model.image_classifier_logic import YOLO_IMAGE_SIZE, INT8_ONNX_SUFFIX
+from models.Image_Classifier_Model.onnx_detector import OnnxDetector
+
+YOLO_MODEL_FILE_NAME = "image_classification.pt"
+CALIBRATION_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+MAX_CALIBRATION_IMAGES = 300
+
+
+class DishCalibrationReader(CalibrationDataReader):
+    """Feeds calibration images through the same letterboxing OnnxDetector applies at inference."""
+
+    def __init__(self, detector: OnnxDetector, image_dir: str):
+        self.detector = detector
+        self.paths = sorted(
+            os.path.join(image_dir, name) for name in os.listdir(image_dir)
+            if name.lower().endswith(CALIBRATION_IMAGE_EXTENSIONS)
+        )[:MAX_CALIBRATION_IMAGES]
+        if not self.paths:
+            raise SystemExit(f"No calibration images found in {image_dir}.")
+        self._paths = iter(self.paths)
+
+    def get_next(self):
+        path = next(self._paths, None)
+        if path is None:
+            return None
+        return {self.detector.input_name: self.detector.preprocess([cv2.imread(path, cv2.IMREAD_COLOR)])}
+
+
+def _float_node_names(model: onnx.ModelProto) -> list:
+    """
+    Names of the nodes left in float: the DFL convolution and everything after the last quantized
+    convolutions, which decode the boxes and class scores. Quantizing those flattens the low class
+    scores to zero and coarsens box coordinates to several pixels.
+    """
+    softmax_outputs = {o for node in model.graph.node if node.op_type == "Softmax" for o in node.output}
+    dfl_convs = {node.name for node in model.graph.node if node.op_type == "Conv" and softmax_outputs & set(node.input)}
+
+    consumers = {}
+    for node in model.graph.node:
+        for name in node.input:
+            consumers.setdefault(name, []).append(node)
+    # Nodes are topologically sorted, so walking them backwards sees every consumer first.
+    feeds_quantized_conv = {}
+    for node in reversed(model.graph.node):
+        feeds_quantized_conv[node.name] = any(
+            (consumer.op_type == "Conv" and consumer.name not in dfl_convs) or feeds_quantized_conv[consumer.name]
+            for output in node.output for consumer in consumers.get(output, [])
+        )
+    return [name for name, feeds in feeds_quantized_conv.items() if not feeds or name in dfl_convs]
+
+
+def quantize_int8(onnx_path: str, calibration_dir: str) -> str:
+    int8_path = os.path.splitext(onnx_path)[0] + INT8_ONNX_SUFFIX
+    prepared_path = os.path.splitext(onnx_path)[0] + ".prep.onnx"
+    reader = DishCalibrationReader(OnnxDetector(onnx_path, imgsz=YOLO_IMAGE_SIZE), calibration_dir)
+    print(f"Calibrating INT8 quantization on {len(reader.paths)} images from {calibration_dir}")
+    # Symbolic shape inference cannot resolve the dynamic export's shapes; ONNX shape inference is enough here.
+    quant_pre_process(onnx_path, prepared_path, skip_symbolic_shape=True)
+    try:
+        quantize_static(
+            prepared_path, int8_path, reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=_float_node_names(onnx.load(prepared_path, load_external_data=False)),
+        )
+    finally:
+        os.remove(prepared_path)
+    return int8_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the YOLO dish detector to ONNX.")
+    parser.add_argument("--int8", metavar="CALIBRATION_DIR", help="also write an INT8 export calibrated on the images in this directory")
+    args = parser.parse_args()
+
+    model_path = str(IMAGE_CLASSIFIER_MODELS_PATH / YOLO_MODEL_FILE_NAME)
+    # FP16 export needs a GPU; CPU-only hosts, and the float graph INT8 is quantized from, use FP32.
+    half = torch.cuda.is_available() and not args.int8
+    onnx_path = YOLO(model_path).export(
+        format="onnx", dynamic=True, half=half, imgsz=YOLO_IMAGE_SIZE, device=0 if half else "cpu"
+    )
+    print(f"Exported {model_path} -> {onnx_path}")
+
+    if args.int8:
+        int8_path = quantize_int8(onnx_path, args.int8)
+        print(f"Quantized {onnx_path} -> {int8_path}")
@@ -1,33 +1,58 @@
 # backend/services/diet_service.py
-import os
-import joblib
-import pandas as pd
-from typing import Any, Dict, Optional
+import asyncio
+import threading
+import numpy as np
+from cachetools import LRUCache
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
-from config.settings import DIET_MODELS_PATH
-from utils.helpers import convert_numpy_types, infer_activity_level
+from config.settings import DIET_MODELS_PATH, MODEL_PREDICTION_CACHE_SIZE, MODEL_MAX_BATCH_SIZE
+from services.model_batcher import PredictionBatcher
+from utils.helpers import infer_activity_level, strip_feature_names, build_label_codes
+from utils.model_serialization import load_model_artifact
 
 
 diet_regressor: Optional[Any] = None
 diet_label_encoders: Optional[Dict[str, Any]] = None
+# Per-encoder {class: code} tables built from diet_label_encoders at load time.
+diet_label_codes: Dict[str, Dict[Any, int]] = {}
 
 DIET_FEATURE_COLUMNS_ORDER = [
     "age", "gender", "height", "weight", "bmi", "calories_intake",
     "exercise_type", "intensity_level", "frequency_per_week", "activity_level"
 ]
 
+_models_lock = threading.Lock()
+
+def load_diet_models_sync():
+    """
+    Loads the diet prediction model and its label encoders.
+    Models are loaded once per process; later calls return the already-deserialized objects.
+    Blocking; safe to run from a worker thread.
+    """
+    with _models_lock:
+        if all([diet_regressor, diet_label_encoders]):
+            return
+        _load_diet_models_locked()
+
 async def load_diet_models():
-    """Loads the diet prediction model and its label encoders."""
-    global diet_regressor, diet_label_encoders
+    """Loads the diet models without blocking the event loop."""
+    await asyncio.to_thread(load_diet_models_sync)
+
+def _load_diet_models_locked():
+    global diet_regressor, diet_label_encoders, diet_label_codes
 
     try:
-        diet_regressor = joblib.load(os.path.join(DIET_MODELS_PATH, "diet_model_rf.pkl"))
-        loaded_diet_encoders = joblib.load(os.path.join(DIET_MODELS_PATH, "diet_label_encoders.pkl"))
+        diet_regressor = load_model_artifact(DIET_MODELS_PATH, "diet_model_rf")
+        # Rows are passed as ndarrays in DIET_FEATURE_COLUMNS_ORDER rather than DataFrames.
+        strip_feature_names(diet_regressor)
+        loaded_diet_encoders = load_model_artifact(DIET_MODELS_PATH, "diet_label_encoders")
         
         if not isinstance(loaded_diet_encoders, dict):
             print("Warning: diet_label_encoders.pkl is not a dictionary. It might still work if gender is handled differently in diet model.")
         
+        diet_label_codes = build_label_codes(loaded_diet_encoders) if isinstance(loaded_diet_encoders, dict) else {}
         diet_label_encoders = loaded_diet_encoders
+        _diet_output_cache.clear()
         print("Diet prediction model and encoders loaded successfully!")
     except FileNotFoundError as e:
         print(f"Error loading diet model: {e}. Make sure diet_model_rf.pkl and diet_label_encoders.pkl are in {DIET_MODELS_PATH}")
@@ -42,13 +67,36 @@ async def load_diet_models():
         print(f"Warning: Diet prediction model will not be available due to error: {e}")
         raise HTTPException(status_code=500, detail=f"Server setup error: Failed to load diet model. {e}")
 
+def _predict_diet_rows(feature_rows: List[tuple]) -> List[np.ndarray]:
+    """Runs the diet model once over a batch of feature rows (in DIET_FEATURE_COLUMNS_ORDER)."""
+    diet_rows = diet_regressor.predict(np.array(feature_rows, dtype=np.float64))
+    # Rows end up in the shared output cache, so keep them read-only.
+    diet_rows.setflags(write=False)
+    return list(diet_rows)
+
+def warm_diet_models():
+    """Runs the model once on a placeholder row so the first request skips its first-call setup."""
+    if diet_regressor is not None:
+        _predict_diet_rows([(0.0,) * len(DIET_FEATURE_COLUMNS_ORDER)])
+
+# Model outputs keyed on the exact feature row; only touched from the event loop and cleared on (re)load.
+_diet_output_cache: LRUCache = LRUCache(maxsize=MODEL_PREDICTION_CACHE_SIZE)
+diet_batcher = PredictionBatcher("diet", _predict_diet_rows, MODEL_MAX_BATCH_SIZE)
+
+async def _diet_outputs(feature_row: tuple) -> np.ndarray:
+    outputs = _diet_output_cache.get(feature_row)
+    if outputs is None:
+        outputs = await diet_batcher.predict(feature_row)
+        _diet_output_cache[feature_row] = outputs
+    return outputs
+
 def get_diet_models_and_encoders():
     """Returns the loaded diet models and encoders, or None if not loaded."""
     if not all([diet_regressor, diet_label_encoders]):
         return None, None
     return diet_regressor, diet_label_encoders
 
-def predict_diet(processed_core_features: Dict[str, Any], exercise_predictions: Dict[str, Any], raw_user_input: Dict[str, Any]) -> Dict[str, Any]:
+async def predict_diet(processed_core_features: Dict[str, Any], exercise_predictions: Dict[str, Any], raw_user_input: Dict[str, Any]) -> Dict[str, Any]:
     """
     Performs diet predictions based on processed user data and exercise predictions.
     Assumes models and encoders are already loaded.
@@ -70,9 +118,9 @@ def predict_diet(processed_core_features: Dict[str, Any], exercise_predictions:
 
         if encoders is not None and 'gender' in encoders and encoders['gender'] is not None:
             try:
-                diet_encoded_gender = encoders['gender'].transform([diet_gender_raw])[0]
-            except ValueError:
-                raise HTTPException(status_code=400, detail=f"Invalid gender for diet model: '{diet_gender_raw}'. Must be one of: {list(encoders['gender'].classes_)}")
+                diet_encoded_gender = diet_label_codes['gender'][diet_gender_raw]
+            except KeyError:
+                raise HTTPException(status_code=400, detail=f"Invalid gender for diet model: '{diet_gender_raw}'. Must be one of: {list(diet_label_codes['gender'])}")
         else:
             print("WARNING: Diet model's 'gender' LabelEncoder is missing. Using pre-processed gender from exercise step.")
             diet_encoded_gender = processed_core_features["gender"]
@@ -85,9 +133,9 @@ def predict_diet(processed_core_features: Dict[str, Any], exercise_predictions:
         ):
             raise HTTPException(status_code=500, detail="Diet label encoders for exercise_type, intensity_level, or activity_level are missing or not loaded.")
         
-        encoded_exercise_type = encoders['exercise_type'].transform([exercise_predictions["exercise_type"]])[0]
-        encoded_intensity_level = encoders['intensity_level'].transform([exercise_predictions["intensity_level"]])[0]
-        encoded_activity_level = encoders['activity_level'].transform([activity_level])[0]
+        encoded_exercise_type = diet_label_codes['exercise_type'][exercise_predictions["exercise_type"]]
+        encoded_intensity_level = diet_label_codes['intensity_level'][exercise_predictions["intensity_level"]]
+        encoded_activity_level = diet_label_codes['activity_level'][activity_level]
 
         diet_model_input_data = {
             "age": processed_core_features["age"],
@@ -102,18 +150,16 @@ def predict_diet(processed_core_features: Dict[str, Any], exercise_predictions:
             "activity_level": encoded_activity_level
         }
         
-        df_for_diet_model = pd.DataFrame([diet_model_input_data])[DIET_FEATURE_COLUMNS_ORDER]
-
         if regressor is None:
             raise HTTPException(status_code=500, detail="Diet prediction model is not loaded.")
-        y_diet_pred = regressor.predict(df_for_diet_model)
+        y_diet_pred = await _diet_outputs(tuple(diet_model_input_data[column] for column in DIET_FEATURE_COLUMNS_ORDER))
         diet_predictions = {
-            "recommended_calories": round(y_diet_pred[0, 0], 2),
-            "protein_grams_per_day": round(y_diet_pred[0, 1], 2),
-            "carbs_grams_per_day": round(y_diet_pred[0, 2], 2),
-            "fats_grams_per_day": round(y_diet_pred[0, 3], 2)
+            "recommended_calories": float(round(y_diet_pred[0], 2)),
+            "protein_grams_per_day": float(round(y_diet_pred[1], 2)),
+            "carbs_grams_per_day": float(round(y_diet_pred[2], 2)),
+            "fats_grams_per_day": float(round(y_diet_pred[3], 2))
         }
-        return convert_numpy_types(diet_predictions)
+        return diet_predictions
 
     except Exception as e:
         print(f"Warning: Error during diet prediction: {str(e)}")
@@ -0,0 +1,27 @@
+# backend/services/dish_service.py
+import numpy as np
+from typing import List, Tuple
+from config.settings import DISH_MAX_BATCH_SIZE
+from models.Image_Classifier_Model.image_classifier_logic import ImageClassifier, DetectionResponse
+from services.model_batcher import PredictionBatcher
+
+def _predict_dish_rows(rows: List[Tuple[ImageClassifier, np.ndarray]]) -> List[DetectionResponse]:
+    """Runs YOLO once over a batch of decoded images; every request in a batch uses the app's one classifier."""
+    image_classifier = rows[0][0]
+    return image_classifier.predict_dishes([img for _, img in rows])
+
+# Concurrent /classify_dish uploads are queued and run through YOLO together, so the model
+# sees one batched predict call instead of one batch=1 call per request. The batcher's single
+# dedicated thread also means batches reach the GPU one at a time.
+dish_batcher = PredictionBatcher("dish", _predict_dish_rows, DISH_MAX_BATCH_SIZE)
+
+async def classify_dish(image_classifier: ImageClassifier, img: np.ndarray) -> DetectionResponse:
+    """Queues a decoded image for the next YOLO batch and waits for its detection response."""
+    return await dish_batcher.predict((image_classifier, img))
+
+def start_dish_batcher():
+    dish_batcher.start()
+
+async def stop_dish_batcher():
+    """Stops the batcher; requests still waiting in the queue are cancelled."""
+    await dish_batcher.stop()
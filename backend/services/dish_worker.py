@@ -0,0 +1,181 @@
+# backend/services/dish_worker.py
+"""
+Dedicated dish-inference process shared by all web workers.
+
+With several uvicorn/gunicorn workers, each one would otherwise load its own YOLO copy and CUDA
+context. When DISH_WORKER_ADDRESS is set, a single process owns the ImageClassifier and the web
+workers send it decoded images over a local socket; the process batches images across workers.
+
+Run standalone from the backend directory with: python -m services.dish_worker
+('python main.py' starts it automatically when DISH_WORKER_ADDRESS is set.)
+"""
+import os
+import queue
+import threading
+import time
+import multiprocessing
+import numpy as np
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Optional, List, Any
+from config.settings import IMAGE_CLASSIFIER_MODELS_PATH, DISH_MAX_BATCH_SIZE, DISH_WORKER_ADDRESS, DISH_WORKER_AUTHKEY
+from models.Image_Classifier_Model.image_classifier_logic import ImageClassifier, DetectionResponse
+
+YOLO_MODEL_FILE_NAME = "image_classification.pt"
+
+
+class _Job:
+    def __init__(self, imgs: List[np.ndarray]):
+        self.imgs = imgs
+        self.responses: Optional[List[DetectionResponse]] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+def _inference_loop(classifier: ImageClassifier, jobs: "queue.Queue[_Job]"):
+    """
+    Groups jobs from every connected web worker into batches of up to DISH_MAX_BATCH_SIZE images.
+    Like PredictionBatcher it never waits for more jobs; those queued during a batch form the next one.
+    """
+    while True:
+        batch = [jobs.get()]
+        image_count = len(batch[0].imgs)
+        while image_count < DISH_MAX_BATCH_SIZE:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(job)
+            image_count += len(job.imgs)
+
+        try:
+            responses = classifier.predict_dishes([img for job in batch for img in job.imgs])
+        except Exception as e:
+            for job in batch:
+                job.error = str(e)
+                job.done.set()
+            continue
+
+        offset = 0
+        for job in batch:
+            job.responses = responses[offset:offset + len(job.imgs)]
+            offset += len(job.imgs)
+            job.done.set()
+
+
+def _serve_connection(conn: Connection, jobs: "queue.Queue[_Job]"):
+    with conn:
+        while True:
+            try:
+                arrays = conn.recv()
+            except (EOFError, OSError):
+                return
+            job = _Job(arrays)
+            jobs.put(job)
+            job.done.wait()
+            if job.error is not None:
+                conn.send(("error", job.error))
+            else:
+                conn.send(("ok", [response.model_dump() for response in job.responses]))
+
+
+def serve(address: str, authkey: str, ready: Optional[Any] = None):
+    """Loads and warms the classifier, then answers inference requests until the process is stopped."""
+    classifier = ImageClassifier(model_path=str(IMAGE_CLASSIFIER_MODELS_PATH / YOLO_MODEL_FILE_NAME))
+    if not classifier.is_loaded:
+        raise RuntimeError("YOLO model did not load correctly within ImageClassifier.")
+    classifier.warmup()
+
+    jobs: "queue.Queue[_Job]" = queue.Queue()
+    threading.Thread(target=_inference_loop, args=(classifier, jobs), daemon=True).start()
+
+    # A socket file left behind by a previous worker would make bind() fail.
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, authkey=authkey.encode()) as listener:
+        print(f"Dish inference worker listening on {address}")
+        if ready is not None:
+            ready.set()
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Raised for clients that fail the authkey handshake; keep serving the others.
+                print(f"Dish inference worker rejected a connection: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, jobs), daemon=True).start()
+
+
+def start_dish_worker_process(address: str, authkey: str, timeout: float = 300.0) -> multiprocessing.Process:
+    """Spawns the inference process and waits until it is listening (model loaded and warmed)."""
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    process = ctx.Process(target=serve, args=(address, authkey, ready), name="dish-worker", daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while not ready.wait(1.0):
+        if not process.is_alive():
+            print(f"Warning: Dish inference worker exited during startup (exit code {process.exitcode}).")
+            break
+        if time.monotonic() > deadline:
+            print(f"Warning: Dish inference worker did not become ready within {timeout:.0f}s.")
+            break
+    return process
+
+
+def stop_dish_worker_process(process: multiprocessing.Process, timeout: float = 10.0):
+    """Terminates the inference process and waits for it to exit, killing it if it does not."""
+    if process.is_alive():
+        process.terminate()
+        process.join(timeout)
+    if process.is_alive():
+        print(f"Warning: Dish inference worker did not exit within {timeout:.0f}s; killing it.")
+        process.kill()
+        process.join()
+
+
+class RemoteImageClassifier:
+    """Client for the dish worker with the same predict interface as ImageClassifier."""
+
+    def __init__(self, address: str, authkey: str):
+        self.address = address
+        self.authkey = authkey.encode()
+        self._lock = threading.Lock()
+        self._conn: Optional[Connection] = Client(self.address, authkey=self.authkey)
+
+    @property
+    def is_loaded(self) -> bool:
+        return True
+
+    def warmup(self, runs: int = 2):
+        # The worker process warms the model itself before it starts accepting connections.
+        pass
+
+    def _request(self, arrays: List[np.ndarray]):
+        if self._conn is None:
+            self._conn = Client(self.address, authkey=self.authkey)
+        try:
+            self._conn.send(arrays)
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._conn = None
+            raise
+
+    def predict_dish(self, img: np.ndarray) -> DetectionResponse:
+        return self.predict_dishes([img])[0]
+
+    def predict_dishes(self, imgs: List[np.ndarray]) -> List[DetectionResponse]:
+        with self._lock:
+            try:
+                status, payload = self._request(imgs)
+            except (EOFError, OSError):
+                # The worker may have been restarted; retry once on a fresh connection.
+                status, payload = self._request(imgs)
+        if status != "ok":
+            raise Exception(f"An error occurred during dish prediction: {payload}")
+        return [DetectionResponse(**response) for response in payload]
+
+
+if __name__ == "__main__":
+    if not DISH_WORKER_ADDRESS or not DISH_WORKER_AUTHKEY:
+        raise SystemExit("Set DISH_WORKER_ADDRESS and DISH_WORKER_AUTHKEY to run the dish inference worker.")
+    serve(DISH_WORKER_ADDRESS, DISH_WORKER_AUTHKEY)
@@ -1,34 +1,65 @@
 # backend/services/exercise_service.py
-import os
-import joblib
-import pandas as pd
-import nest_asyncio
-from typing import Any, Dict, Optional
+import asyncio
+import threading
+import numpy as np
+from cachetools import LRUCache
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
-from config.settings import EXERCISE_MODELS_PATH
+from config.settings import EXERCISE_MODELS_PATH, MODEL_PREDICTION_CACHE_SIZE, MODEL_MAX_BATCH_SIZE
 from models.request_models import UserInput
-from utils.helpers import convert_numpy_types
+from services.model_batcher import PredictionBatcher
+from utils.helpers import strip_feature_names, build_label_codes
+from utils.model_serialization import load_model_artifact
 
 
 multi_clf: Optional[Any] = None
 multi_reg: Optional[Any] = None
 label_encoders: Optional[Dict[str, Any]] = None
+# Per-encoder {class: code} tables and code-indexed class lists, built from label_encoders at load time.
+label_codes: Dict[str, Dict[Any, int]] = {}
+label_classes: Dict[str, List[Any]] = {}
 
 EXERCISE_FEATURE_COLUMNS_ORDER = ["age", "gender", "height", "weight", "bmi", "calories_intake"]
 
+INCHES_PER_HEIGHT_UNIT = {"cm": 0.393701, "inches": 1.0, "feet": 12.0}
+KG_PER_WEIGHT_UNIT = {"kg": 1.0, "lbs": 0.453592}
+METERS_PER_INCH = 0.0254
+
+_models_lock = threading.Lock()
+
+
+def load_exercise_models_sync():
+    """
+    Loads the exercise prediction models and their label encoders.
+    Models are loaded once per process; later calls return the already-deserialized objects.
+    Blocking; safe to run from a worker thread.
+    """
+    with _models_lock:
+        if all([multi_clf, multi_reg, label_encoders]):
+            return
+        _load_exercise_models_locked()
 
 async def load_exercise_models():
-    """Loads the exercise prediction models and their label encoders."""
-    global multi_clf, multi_reg, label_encoders
+    """Loads the exercise models without blocking the event loop."""
+    await asyncio.to_thread(load_exercise_models_sync)
+
+def _load_exercise_models_locked():
+    global multi_clf, multi_reg, label_encoders, label_codes, label_classes
 
     try:
-        multi_clf = joblib.load(os.path.join(EXERCISE_MODELS_PATH, "multi_classifier.pkl"))
-        multi_reg = joblib.load(os.path.join(EXERCISE_MODELS_PATH, "multi_regressor.pkl"))
-        loaded_encoders = joblib.load(os.path.join(EXERCISE_MODELS_PATH, "label_encoders.pkl"))
+        multi_clf = load_model_artifact(EXERCISE_MODELS_PATH, "multi_classifier")
+        multi_reg = load_model_artifact(EXERCISE_MODELS_PATH, "multi_regressor")
+        # Rows are passed as ndarrays in EXERCISE_FEATURE_COLUMNS_ORDER rather than DataFrames.
+        strip_feature_names(multi_clf)
+        strip_feature_names(multi_reg)
+        loaded_encoders = load_model_artifact(EXERCISE_MODELS_PATH, "label_encoders")
 
         if not isinstance(loaded_encoders, dict) or 'gender' not in loaded_encoders:
             raise ValueError("label_encoders.pkl is not a dictionary or is missing 'gender' encoder.")
+        label_codes = build_label_codes(loaded_encoders)
+        label_classes = {name: list(codes) for name, codes in label_codes.items()}
         label_encoders = loaded_encoders
+        _exercise_output_cache.clear()
         print("Exercise prediction models and encoders loaded successfully!")
 
     except FileNotFoundError as e:
@@ -38,36 +69,30 @@ async def load_exercise_models():
         print(f"An unexpected error occurred loading exercise models: {e}")
         raise HTTPException(status_code=500, detail=f"Server setup error: Failed to load exercise models. {e}")
 
-def preprocess_user_data_for_exercise(data: UserInput) -> tuple[pd.DataFrame, Dict[str, Any]]:
+def preprocess_user_data_for_exercise(data: UserInput) -> tuple[tuple, Dict[str, Any]]:
     """
-    Preprocesses raw user input into a DataFrame suitable for the exercise models.
+    Preprocesses raw user input into a feature row suitable for the exercise models.
     Handles unit conversions, BMI calculation, and categorical encoding for gender.
-    Returns the DataFrame and a dictionary of processed core features for later use.
+    Returns the row (in EXERCISE_FEATURE_COLUMNS_ORDER) and a dictionary of processed core features for later use.
     """
     if label_encoders is None or 'gender' not in label_encoders:
         raise HTTPException(status_code=500, detail="Gender LabelEncoder not loaded or missing from 'label_encoders'.")
     
-    height_in_inches = data.height_value
-    if data.height_unit.lower() == 'cm':
-        height_in_inches = data.height_value * 0.393701
-    elif data.height_unit.lower() == 'feet':
-        height_in_inches = data.height_value * 12
+    # UserInput only admits the lowercase units listed in these tables.
+    height_in_inches = data.height_value * INCHES_PER_HEIGHT_UNIT[data.height_unit]
+    weight_in_kg = data.weight_value * KG_PER_WEIGHT_UNIT[data.weight_unit]
 
-    weight_in_kg = data.weight_value
-    if data.weight_unit.lower() == 'lbs':
-        weight_in_kg = data.weight_value * 0.453592
+    height_in_meters = height_in_inches * METERS_PER_INCH
+    bmi = weight_in_kg / (height_in_meters * height_in_meters) if height_in_meters > 0 else 0.0
 
-    height_in_meters = height_in_inches * 0.0254
-    bmi = weight_in_kg / (height_in_meters ** 2) if height_in_meters > 0 else 0.0
-
-    gender_le = label_encoders.get('gender')
-    if not gender_le:
+    gender_codes = label_codes.get('gender')
+    if not gender_codes:
         raise HTTPException(status_code=500, detail="Gender LabelEncoder found None in 'label_encoders'.")
     
     try:
-        encoded_gender = gender_le.transform([data.gender.lower()])[0]
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid gender value: '{data.gender}'. Must be one of: {list(gender_le.classes_)}")
+        encoded_gender = gender_codes[data.gender.lower()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Invalid gender value: '{data.gender}'. Must be one of: {list(gender_codes)}")
 
     processed_core_features = {
         "age": data.age,
@@ -78,9 +103,37 @@ def preprocess_user_data_for_exercise(data: UserInput) -> tuple[pd.DataFrame, Di
         "calories_intake": data.calories_intake
     }
 
-    df_for_exercise_model = pd.DataFrame([processed_core_features])[EXERCISE_FEATURE_COLUMNS_ORDER]
-
-    return df_for_exercise_model, processed_core_features
+    # A plain tuple rather than a one-row DataFrame: it doubles as the output cache key and batches stack it cheaply.
+    feature_row = tuple(processed_core_features[column] for column in EXERCISE_FEATURE_COLUMNS_ORDER)
+
+    return feature_row, processed_core_features
+
+def _predict_exercise_rows(feature_rows: List[tuple]) -> List[tuple[np.ndarray, np.ndarray]]:
+    """Runs both exercise models once over a batch of feature rows (in EXERCISE_FEATURE_COLUMNS_ORDER)."""
+    features = np.array(feature_rows, dtype=np.float64)
+    class_rows = multi_clf.predict(features)
+    reg_rows = multi_reg.predict(features)
+    # Rows end up in the shared output cache, so keep them read-only.
+    class_rows.setflags(write=False)
+    reg_rows.setflags(write=False)
+    return list(zip(class_rows, reg_rows))
+
+def warm_exercise_models():
+    """Runs both models once on a placeholder row so the first request skips their first-call setup."""
+    if multi_clf is not None and multi_reg is not None:
+        _predict_exercise_rows([(0.0,) * len(EXERCISE_FEATURE_COLUMNS_ORDER)])
+
+# Model outputs keyed on the exact feature row, so repeat submissions skip the forests entirely.
+# Only touched from the event loop; cleared whenever the models are (re)loaded.
+_exercise_output_cache: LRUCache = LRUCache(maxsize=MODEL_PREDICTION_CACHE_SIZE)
+exercise_batcher = PredictionBatcher("exercise", _predict_exercise_rows, MODEL_MAX_BATCH_SIZE)
+
+async def _exercise_outputs(feature_row: tuple) -> tuple[np.ndarray, np.ndarray]:
+    outputs = _exercise_output_cache.get(feature_row)
+    if outputs is None:
+        outputs = await exercise_batcher.predict(feature_row)
+        _exercise_output_cache[feature_row] = outputs
+    return outputs
 
 def get_exercise_models_and_encoders():
     """Returns the loaded exercise models and encoders, or None if not loaded."""
@@ -88,20 +141,15 @@ def get_exercise_models_and_encoders():
         return None, None, None
     return multi_clf, multi_reg, label_encoders
 
-def predict_exercise(user_input_data: UserInput) -> Dict[str, Any]:
+async def predict_exercise(user_input_data: UserInput) -> tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Performs exercise predictions based on user input.
     Ensures models and encoders are loaded before prediction.
+    Returns the predictions and the processed core features they were computed from.
     """
     clf, reg, encoders = get_exercise_models_and_encoders()
     if not all([clf, reg, encoders]):
-        import asyncio
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            nest_asyncio.apply()
-            loop.run_until_complete(load_exercise_models())
-        else:
-            loop.run_until_complete(load_exercise_models())
+        await load_exercise_models()
         clf, reg, encoders = get_exercise_models_and_encoders()
         if not all([clf, reg, encoders]):
             raise HTTPException(status_code=500, detail="Exercise models or encoders are not loaded. Server might be misconfigured.")
@@ -109,18 +157,18 @@ def predict_exercise(user_input_data: UserInput) -> Dict[str, Any]:
     if clf is None or reg is None or encoders is None:
         raise HTTPException(status_code=500, detail="Exercise models or encoders are not loaded. Cannot perform prediction.")
 
-    df_for_exercise, processed_core_features = preprocess_user_data_for_exercise(user_input_data)
+    feature_row, processed_core_features = preprocess_user_data_for_exercise(user_input_data)
 
     try:
-        y_class_pred_encoded = clf.predict(df_for_exercise)
-        y_reg_pred = reg.predict(df_for_exercise)
+        y_class_pred_encoded, y_reg_pred = await _exercise_outputs(feature_row)
 
-        predicted_exercise_type = encoders['exercise_type'].inverse_transform([y_class_pred_encoded[0, 0]])[0]
-        predicted_intensity_level = encoders['intensity_level'].inverse_transform([y_class_pred_encoded[0, 1]])[0]
+        # Build plain Python values directly so nothing needs a numpy conversion pass downstream.
+        predicted_exercise_type = label_classes['exercise_type'][y_class_pred_encoded[0]]
+        predicted_intensity_level = label_classes['intensity_level'][y_class_pred_encoded[1]]
         
-        predicted_frequency_per_week_val = round(y_reg_pred[0, 0])
-        predicted_duration_minutes = round(y_reg_pred[0, 1], 2)
-        predicted_estimated_calorie_burn = round(y_reg_pred[0, 2], 2)
+        predicted_frequency_per_week_val = round(y_reg_pred[0])
+        predicted_duration_minutes = float(round(y_reg_pred[1], 2))
+        predicted_estimated_calorie_burn = float(round(y_reg_pred[2], 2))
 
         exercise_predictions = {
             "exercise_type": predicted_exercise_type,
@@ -129,7 +177,7 @@ def predict_exercise(user_input_data: UserInput) -> Dict[str, Any]:
             "duration_minutes": predicted_duration_minutes,
             "estimated_calorie_burn": predicted_estimated_calorie_burn
         }
-        return convert_numpy_types(exercise_predictions)
+        return exercise_predictions, processed_core_features
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during exercise prediction: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,82 @@
+# backend/services/model_batcher.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent single-row predictions into one batched call.
+
+    A random forest's predict cost is dominated by per-call overhead (input validation and the
+    joblib dispatch over trees), so scoring 32 rows takes about as long as scoring one.
+    Batches are scored on a dedicated thread, keeping the forest traversal off the event loop.
+    The batcher never waits for more rows: a lone row is scored at once, and rows queued while
+    a batch is running are stacked into the next one. The dish detector batches its images the
+    same way.
+    """
+
+    def __init__(self, name: str, predict_rows: Callable[[List[tuple]], List[Any]], max_batch_size: int):
+        self.name = name
+        self.predict_rows = predict_rows
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def predict(self, row: tuple) -> Any:
+        """Queues one feature row for the next batch and waits for its prediction."""
+        if self._queue is None:
+            raise RuntimeError(f"{self.name} prediction batcher is not running.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _run_batch(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        # Requests whose client went away have already been cancelled; don't spend inference on them.
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.predict_rows, [row for row, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._run_batch(batch)
+
+    def start(self):
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-model")
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        """Stops the batcher; rows still waiting in the queue are cancelled."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+        # Let a batch that is already running finish before the process tears the model down.
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        self._queue = None
+        self._task = None
+        self._executor = None
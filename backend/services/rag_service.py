@@ -185,10 +185,10 @@ async def load_rag_knowledge_base():
 
     if os.path.exists(VECTOR_DB_PERSIST_PATH) and os.listdir(VECTOR_DB_PERSIST_PATH):
         print(f"Found existing vector store at {VECTOR_DB_PERSIST_PATH}. Loading it.")
-        vectorstore = Chroma(persist_directory=VECTOR_DB_PERSIST_PATH, embedding_function=embeddings)
+        vectorstore = Chroma(persist_directory=str(VECTOR_DB_PERSIST_PATH), embedding_function=embeddings)
     else:
         print(f"No existing vector store found. Creating new one at {VECTOR_DB_PERSIST_PATH}...")
-        vectorstore = Chroma.from_documents(documents, embeddings, persist_directory=VECTOR_DB_PERSIST_PATH)
+        vectorstore = Chroma.from_documents(documents, embeddings, persist_directory=str(VECTOR_DB_PERSIST_PATH))
         print("New vector store created and persisted.")
 
     print("Vector store initialized.")
@@ -1,9 +1,11 @@
 # backend/services/report_service.py
 import io
+import asyncio
 import datetime
 from typing import Any, Dict, Optional
+from cachetools import LRUCache
 from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -11,28 +13,15 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 
 from models.request_models import ReportRequest, UserPersonalDetails
-from database.mongodb_client import get_db_collection
-from utils.helpers import convert_numpy_types
+from utils.helpers import compute_input_hash
 
-async def generate_report(report_request: ReportRequest) -> StreamingResponse:
-    """
-    Generates a PDF report based on stored session predictions and user details.
-    """
-    try:
-        predictions_collection = get_db_collection("predictions")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {e}")
-
-    prediction_record = predictions_collection.find_one({"session_id": report_request.session_id})
+# Fields of a stored record that appear in the report.
+_REPORT_PROJECTION = {"raw_user_input": 1, "exercise_predictions": 1, "diet_predictions": 1, "_id": 0}
+# Finished PDFs keyed on a hash of everything they are built from, so re-downloading an unchanged
+# report skips ReportLab. A changed plan or user details hashes to a new key.
+_report_cache: LRUCache = LRUCache(maxsize=256)
 
-    if not prediction_record:
-        raise HTTPException(status_code=404, detail=f"No predictions found for session ID: {report_request.session_id}")
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter,
-                            rightMargin=inch, leftMargin=inch,
-                            topMargin=inch, bottomMargin=inch)
-    
+def _build_report_styles():
     styles = getSampleStyleSheet()
 
     # Define custom styles
@@ -67,7 +56,87 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
                               spaceAfter=5,
                               alignment=1,
                               fontName='Helvetica-Bold'))
+    return styles
 
+# Styles are read-only during layout, so they are built once and shared by every report.
+REPORT_STYLES = _build_report_styles()
+USER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#E8F5E9')),
+    ('TEXTCOLOR', (0,0), (-1,-1), colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#A5D6A7')),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('TOPPADDING', (0,0), (-1,-1), 6),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+])
+RAW_INPUT_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#BDBDBD')),
+    ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#F5F5F5')),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('TOPPADDING', (0,0), (-1,-1), 6),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+])
+EXERCISE_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#81C784')),
+    ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#C8E6C9')),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('TOPPADDING', (0,0), (-1,-1), 6),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+])
+DIET_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#64B5F6')),
+    ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#BBDEFB')),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('TOPPADDING', (0,0), (-1,-1), 6),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+])
+
+async def generate_report(report_request: ReportRequest, predictions_collection: Any) -> Response:
+    """
+    Generates a PDF report based on stored session predictions and user details.
+    """
+    if predictions_collection is None:
+        raise HTTPException(status_code=500, detail="Database error: MongoDB database connection not established.")
+
+    prediction_record = await predictions_collection.find_one({"session_id": report_request.session_id}, projection=_REPORT_PROJECTION)
+
+    if not prediction_record:
+        raise HTTPException(status_code=404, detail=f"No predictions found for session ID: {report_request.session_id}")
+
+    user_details = report_request.user_details
+    report_key = compute_input_hash({
+        "record": prediction_record,
+        "user_details": user_details.model_dump() if user_details else None
+    })
+    pdf_bytes = _report_cache.get(report_key)
+    if pdf_bytes is None:
+        # ReportLab layout is CPU-bound pure Python; build the document off the event loop.
+        pdf_bytes = await asyncio.to_thread(build_report_pdf, prediction_record, user_details)
+        _report_cache[report_key] = pdf_bytes
+
+    filename = f"Fitness_Report_{report_request.session_id}_{datetime.date.today()}.pdf"
+    return Response(content=pdf_bytes, media_type="application/pdf",
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+def build_report_pdf(prediction_record: Dict[str, Any], user_details: Optional[UserPersonalDetails]) -> bytes:
+    """Lays out the report for a stored prediction record and returns the finished PDF. Blocking; run it in a worker thread."""
+    styles = REPORT_STYLES
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter,
+                            rightMargin=inch, leftMargin=inch,
+                            topMargin=inch, bottomMargin=inch)
+    
     elements = []
 
     # Title
@@ -75,27 +144,16 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
     elements.append(Spacer(1, 0.3 * inch))
 
     # User Details
-    if report_request.user_details and any(report_request.user_details.dict().values()):
+    if user_details and any(user_details.dict().values()):
         elements.append(Paragraph("User Personal Details", styles['SectionHeader']))
         user_data = []
-        if report_request.user_details.first_name: user_data.append(["First Name:", report_request.user_details.first_name])
-        if report_request.user_details.last_name: user_data.append(["Last Name:", report_request.user_details.last_name])
-        if report_request.user_details.email: user_data.append(["Email:", report_request.user_details.email])
-        if report_request.user_details.phone: user_data.append(["Phone:", report_request.user_details.phone])
+        if user_details.first_name: user_data.append(["First Name:", user_details.first_name])
+        if user_details.last_name: user_data.append(["Last Name:", user_details.last_name])
+        if user_details.email: user_data.append(["Email:", user_details.email])
+        if user_details.phone: user_data.append(["Phone:", user_details.phone])
         
         if user_data:
-            table_style = TableStyle([
-                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#E8F5E9')),
-                ('TEXTCOLOR', (0,0), (-1,-1), colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#A5D6A7')),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('TOPPADDING', (0,0), (-1,-1), 6),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-            ])
-            elements.append(Table(user_data, style=table_style, colWidths=[2*inch, 4*inch]))
+            elements.append(Table(user_data, style=USER_TABLE_STYLE, colWidths=[2*inch, 4*inch]))
             elements.append(Spacer(1, 0.2 * inch))
 
     # Submitted Data
@@ -114,16 +172,7 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
         raw_input_data_for_report.append(["Food Preferences:", raw_user_input_stored['food_preferences']])
 
     if raw_input_data_for_report:
-        elements.append(Table(raw_input_data_for_report, style=TableStyle([
-            ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#BDBDBD')),
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#F5F5F5')),
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-        ]), colWidths=[2*inch, 4*inch]))
+        elements.append(Table(raw_input_data_for_report, style=RAW_INPUT_TABLE_STYLE, colWidths=[2*inch, 4*inch]))
         elements.append(Spacer(1, 0.2 * inch))
 
     # Exercise Plan
@@ -132,16 +181,7 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
     for key, value in prediction_record.get('exercise_predictions', {}).items():
         exercise_data.append([key.replace('_', ' ').title() + ":", str(value)])
     if exercise_data:
-        elements.append(Table(exercise_data, style=TableStyle([
-            ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#81C784')),
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#C8E6C9')),
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-        ]), colWidths=[2.5*inch, 3.5*inch]))
+        elements.append(Table(exercise_data, style=EXERCISE_TABLE_STYLE, colWidths=[2.5*inch, 3.5*inch]))
         elements.append(Spacer(1, 0.2 * inch))
 
     # Diet Plan
@@ -154,16 +194,7 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
             if key != "message":
                 diet_data.append([key.replace('_', ' ').title() + ":", str(value)])
         if diet_data:
-            elements.append(Table(diet_data, style=TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.HexColor('#64B5F6')),
-                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#BBDEFB')),
-                ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('TOPPADDING', (0,0), (-1,-1), 6),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-            ]), colWidths=[2.5*inch, 3.5*inch]))
+            elements.append(Table(diet_data, style=DIET_TABLE_STYLE, colWidths=[2.5*inch, 3.5*inch]))
             elements.append(Spacer(1, 0.2 * inch))
     elif diet_predictions_data and "error" in diet_predictions_data:
         elements.append(Paragraph("Diet Plan Status:", styles['SectionHeader']))
@@ -177,8 +208,4 @@ async def generate_report(report_request: ReportRequest) -> StreamingResponse:
 
     # Build PDF
     doc.build(elements)
-    buffer.seek(0)
-
-    filename = f"Fitness_Report_{report_request.session_id}_{datetime.date.today()}.pdf"
-    return StreamingResponse(buffer, media_type="application/pdf",
-                             headers={"Content-Disposition": f"attachment; filename={filename}"})
\ No newline at end of file
+    return buffer.getvalue()
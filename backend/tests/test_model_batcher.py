@@ -0,0 +1,63 @@
+# backend/tests/test_model_batcher.py
+import asyncio
+import pytest
+
+from services.model_batcher import PredictionBatcher
+
+
+def _run(batcher: PredictionBatcher, body):
+    async def main():
+        batcher.start()
+        try:
+            return await body()
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_rows_are_scored_in_batches():
+    batches = []
+
+    def predict_rows(rows):
+        batches.append(len(rows))
+        return [row[0] * 2 for row in rows]
+
+    batcher = PredictionBatcher("test", predict_rows, max_batch_size=4)
+    results = _run(batcher, lambda: asyncio.gather(*(batcher.predict((i,)) for i in range(10))))
+    assert results == [i * 2 for i in range(10)]
+    assert batches == [4, 4, 2]
+
+
+def test_lone_row_is_scored_on_its_own():
+    batches = []
+
+    def predict_rows(rows):
+        batches.append(len(rows))
+        return rows
+
+    batcher = PredictionBatcher("test", predict_rows, max_batch_size=4)
+
+    async def body():
+        return [await batcher.predict((i,)) for i in range(3)]
+
+    assert _run(batcher, body) == [(0,), (1,), (2,)]
+    assert batches == [1, 1, 1]
+
+
+def test_errors_reach_every_row_in_the_batch():
+    def predict_rows(rows):
+        raise ValueError("model failed")
+
+    batcher = PredictionBatcher("test", predict_rows, max_batch_size=4)
+
+    async def body():
+        return await asyncio.gather(*(batcher.predict((i,)) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in _run(batcher, body))
+
+
+def test_predict_fails_when_batcher_is_not_running():
+    batcher = PredictionBatcher("test", lambda rows: rows, max_batch_size=4)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.predict((0,)))
@@ -0,0 +1,87 @@
+# backend/tests/test_model_serialization.py
+import json
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.multioutput import MultiOutputClassifier, MultiOutputRegressor
+from sklearn.preprocessing import LabelEncoder
+
+from config.settings import EXERCISE_MODELS_PATH, DIET_MODELS_PATH
+from utils.helpers import strip_feature_names
+from utils.model_serialization import (
+    MANIFEST_SUFFIX, ONNX_SUFFIX, ORT_SUFFIX, PICKLE_SUFFIX, TENSORS_SUFFIX,
+    load_model, model_artifact_path, save_model,
+)
+
+SHIPPED_MODELS = [
+    (EXERCISE_MODELS_PATH, "multi_classifier", 6),
+    (EXERCISE_MODELS_PATH, "multi_regressor", 6),
+    (DIET_MODELS_PATH, "diet_model_rf", 10),
+]
+
+
+def _training_data(n_features: int = 6):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, size=(200, n_features))
+    y_class = np.stack([(X[:, 0] > 50).astype(int), (X[:, 1] // 34).astype(int)], axis=1)
+    y_reg = np.stack([X[:, 2] * 2 + X[:, 3], X[:, 4] - X[:, 5]], axis=1)
+    return X, y_class, y_reg
+
+
+def test_forest_round_trip_predicts_identically(tmp_path):
+    X, y_class, y_reg = _training_data()
+    classifier = MultiOutputClassifier(RandomForestClassifier(n_estimators=5, random_state=0)).fit(X, y_class)
+    regressor = MultiOutputRegressor(RandomForestRegressor(n_estimators=5, random_state=0)).fit(X, y_reg)
+
+    for name, model in (("classifier", classifier), ("regressor", regressor)):
+        save_model(model, str(tmp_path / name))
+        restored = load_model(str(tmp_path / name))
+        assert type(restored) is type(model)
+        np.testing.assert_array_equal(restored.predict(X), model.predict(X))
+
+
+def test_label_encoders_round_trip(tmp_path):
+    encoders = {
+        "gender": LabelEncoder().fit(["female", "male"]),
+        "intensity_level": LabelEncoder().fit(["high", "low", "medium"]),
+    }
+    save_model(encoders, str(tmp_path / "encoders"))
+    restored = load_model(str(tmp_path / "encoders"))
+    assert set(restored) == set(encoders)
+    for name, encoder in encoders.items():
+        np.testing.assert_array_equal(restored[name].classes_, encoder.classes_)
+        assert list(restored[name].transform(encoder.classes_)) == list(range(len(encoder.classes_)))
+
+
+def test_manifest_refuses_non_sklearn_classes(tmp_path):
+    save_model(LabelEncoder().fit(["a", "b"]), str(tmp_path / "encoder"))
+    manifest_path = tmp_path / ("encoder" + MANIFEST_SUFFIX)
+    manifest = json.loads(manifest_path.read_text())
+    manifest["root"]["__estimator__"] = "os.system"
+    manifest_path.write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        load_model(str(tmp_path / "encoder"))
+
+
+@pytest.mark.parametrize("models_path, name, n_features", SHIPPED_MODELS)
+def test_shipped_safetensors_export_matches_pickle(models_path, name, n_features):
+    path_stem = str(models_path / name)
+    if not (models_path / (name + TENSORS_SUFFIX)).exists():
+        pytest.skip(f"{name} has no safetensors export")
+    exported, pickled = load_model(path_stem), joblib.load(path_stem + PICKLE_SUFFIX)
+    strip_feature_names(exported)
+    strip_feature_names(pickled)
+    X = np.random.default_rng(1).uniform(0, 100, size=(50, n_features))
+    np.testing.assert_array_equal(exported.predict(X), pickled.predict(X))
+
+
+def test_model_artifact_path_preference(tmp_path):
+    stem = tmp_path / "model"
+    preference = [ORT_SUFFIX, ONNX_SUFFIX, TENSORS_SUFFIX]
+    for suffix in [PICKLE_SUFFIX, MANIFEST_SUFFIX] + preference:
+        (tmp_path / ("model" + suffix)).write_bytes(b"")
+    for suffix in preference:
+        assert model_artifact_path(str(tmp_path), "model") == str(stem) + suffix
+        (tmp_path / ("model" + suffix)).unlink()
+    assert model_artifact_path(str(tmp_path), "model") == str(stem) + PICKLE_SUFFIX
@@ -0,0 +1,98 @@
+# backend/tests/test_onnx_detector.py
+import os
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from config.settings import IMAGE_CLASSIFIER_MODELS_PATH
+from models.Image_Classifier_Model.image_classifier_logic import YOLO_IMAGE_SIZE
+from models.Image_Classifier_Model.onnx_detector import LETTERBOX_FILL, OnnxDetector
+
+ONNX_PATH = IMAGE_CLASSIFIER_MODELS_PATH / "image_classification.onnx"
+PT_PATH = IMAGE_CLASSIFIER_MODELS_PATH / "image_classification.pt"
+IMAGE_SHAPES = [(500, 640, 3), (1080, 810, 3), (333, 777, 3), (640, 640, 3), (100, 60, 3)]
+
+
+def _detector(dynamic: bool = True) -> OnnxDetector:
+    """A detector without a session, for exercising the pre- and post-processing on their own."""
+    detector = OnnxDetector.__new__(OnnxDetector)
+    detector.imgsz = YOLO_IMAGE_SIZE
+    detector.stride = 32
+    detector.dynamic = dynamic
+    return detector
+
+
+def _image(shape) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_letterbox_pads_to_the_stride_with_the_fill_value():
+    img = np.full((500, 640, 3), 7, dtype=np.uint8)
+    boxed = _detector()._letterbox(img)
+    # 500 rows need 12 rows of padding to reach a multiple of 32, split evenly above and below.
+    assert boxed.shape == (512, 640, 3)
+    assert (boxed[:6] == LETTERBOX_FILL).all() and (boxed[-6:] == LETTERBOX_FILL).all()
+    assert (boxed[6:-6] == 7).all()
+
+
+def test_static_letterbox_fills_the_square_input():
+    boxed = _detector(dynamic=False)._letterbox(_image((333, 777, 3)))
+    assert boxed.shape == (YOLO_IMAGE_SIZE, YOLO_IMAGE_SIZE, 3)
+
+
+@pytest.mark.parametrize("dynamic", [True, False])
+@pytest.mark.parametrize("shape", IMAGE_SHAPES)
+def test_letterbox_matches_ultralytics(shape, dynamic):
+    augment = pytest.importorskip("ultralytics.data.augment")
+    img = _image(shape)
+    expected = augment.LetterBox((YOLO_IMAGE_SIZE, YOLO_IMAGE_SIZE), auto=dynamic, stride=32)(image=img)
+    np.testing.assert_array_equal(_detector(dynamic)._letterbox(img), expected)
+
+
+@pytest.mark.parametrize("shape", IMAGE_SHAPES)
+def test_scale_boxes_undoes_the_letterbox(shape):
+    detector = _detector()
+    input_shape = detector._letterbox(_image(shape)).shape[:2]
+    gain = min(input_shape[0] / shape[0], input_shape[1] / shape[1])
+    pad_x = round((input_shape[1] - shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - shape[0] * gain) / 2 - 0.1)
+    source = np.array([[10.0, 20.0, shape[1] / 2, shape[0] / 2]], dtype=np.float32)
+    letterboxed = source * gain + np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+    np.testing.assert_allclose(detector._scale_boxes(letterboxed, input_shape, shape[:2]), source, atol=1e-3)
+
+
+def test_nms_keeps_the_best_box_per_class():
+    # Columns are (cx, cy, w, h, score for class 0, score for class 1).
+    candidates = np.array([
+        [100, 100, 50, 50, 0.90, 0.00],
+        [102, 100, 50, 50, 0.80, 0.00],   # overlaps the first box in the same class
+        [102, 100, 50, 50, 0.00, 0.70],   # same place, other class
+        [300, 300, 20, 20, 0.005, 0.00],  # below the confidence threshold
+    ], dtype=np.float32)
+    detections = _detector()._nms(candidates.T, conf=0.25, iou=0.7)
+    np.testing.assert_allclose(detections, [
+        [75, 75, 125, 125, 0.90, 0],
+        [77, 75, 127, 125, 0.70, 1],
+    ], rtol=1e-6)
+
+
+def test_nms_without_candidates_returns_no_rows():
+    candidates = np.zeros((6, 10), dtype=np.float32)
+    assert _detector()._nms(candidates, conf=0.25, iou=0.7).shape == (0, 6)
+
+
+def test_onnx_export_matches_pytorch_checkpoint():
+    if not ONNX_PATH.exists() or not PT_PATH.exists():
+        pytest.skip("the ONNX export or the PyTorch checkpoint is missing")
+    ultralytics = pytest.importorskip("ultralytics")
+    sample = os.path.join(os.path.dirname(ultralytics.__file__), "assets", "bus.jpg")
+    img = cv2.imread(sample, cv2.IMREAD_COLOR)
+    # A low threshold so the sample photo, which shows no dishes, still yields boxes to compare.
+    detections = OnnxDetector(str(ONNX_PATH), imgsz=YOLO_IMAGE_SIZE).predict([img], conf=0.01, iou=0.7)[0]
+    boxes = ultralytics.YOLO(str(PT_PATH)).predict(img, conf=0.01, iou=0.7, imgsz=YOLO_IMAGE_SIZE, verbose=False)[0].boxes
+    expected = np.concatenate([boxes.xyxy.numpy(), boxes.conf.numpy()[:, None], boxes.cls.numpy()[:, None]], axis=1)
+
+    assert len(detections) > 0
+    np.testing.assert_allclose(detections, expected, atol=1e-2)
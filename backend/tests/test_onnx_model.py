@@ -0,0 +1,54 @@
+# backend/tests/test_onnx_model.py
+import joblib
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from config.settings import EXERCISE_MODELS_PATH, DIET_MODELS_PATH
+from utils.helpers import strip_feature_names
+from utils.model_serialization import ONNX_SUFFIX, ORT_SUFFIX, PICKLE_SUFFIX
+from utils.onnx_model import OnnxTreeModel
+
+
+def _exercise_rows(n: int) -> np.ndarray:
+    """Feature rows in EXERCISE_FEATURE_COLUMNS_ORDER over the ranges real users submit."""
+    rng = np.random.default_rng(0)
+    height = rng.uniform(55, 80, n)
+    weight = rng.uniform(40, 140, n)
+    bmi = weight / (height * 0.0254) ** 2
+    return np.stack([rng.integers(16, 80, n), rng.integers(0, 2, n), height, weight, bmi, rng.integers(1200, 4500, n)], axis=1)
+
+
+def _diet_rows(n: int) -> np.ndarray:
+    """Exercise rows extended with the encoded plan fields, in DIET_FEATURE_COLUMNS_ORDER."""
+    rng = np.random.default_rng(1)
+    plan = np.stack([rng.integers(0, 5, n), rng.integers(0, 3, n), rng.integers(1, 8, n), rng.integers(0, 4, n)], axis=1)
+    return np.concatenate([_exercise_rows(n), plan], axis=1)
+
+
+CASES = [
+    (EXERCISE_MODELS_PATH, "multi_classifier", _exercise_rows),
+    (EXERCISE_MODELS_PATH, "multi_regressor", _exercise_rows),
+    (DIET_MODELS_PATH, "diet_model_rf", _diet_rows),
+]
+
+
+@pytest.mark.parametrize("suffix", [ONNX_SUFFIX, ORT_SUFFIX])
+@pytest.mark.parametrize("models_path, name, make_rows", CASES)
+def test_export_matches_sklearn(models_path, name, make_rows, suffix):
+    export_path = models_path / (name + suffix)
+    if not export_path.exists():
+        pytest.skip(f"{export_path.name} has not been exported")
+    sklearn_model = joblib.load(models_path / (name + PICKLE_SUFFIX))
+    strip_feature_names(sklearn_model)
+    onnx_model = OnnxTreeModel(str(export_path))
+
+    X = make_rows(500)
+    expected, actual = sklearn_model.predict(X), onnx_model.predict(X)
+    assert actual.shape == expected.shape
+    if onnx_model.is_classifier:
+        np.testing.assert_array_equal(actual, expected)
+    else:
+        # The export sums leaf values in float32.
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-3)
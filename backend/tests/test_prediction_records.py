@@ -0,0 +1,82 @@
+# backend/tests/test_prediction_records.py
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.helpers import compute_input_hash
+
+USER_INPUT = {
+    "session_id": "s1", "age": 30, "gender": "male", "height_value": 180.0, "height_unit": "cm",
+    "weight_value": 80.0, "weight_unit": "kg", "calories_intake": 2500,
+}
+
+
+class FakeCollection:
+    def __init__(self, stored=None):
+        self.stored = stored
+
+    async def find_one(self, query, projection=None):
+        if self.stored is None or self.stored["session_id"] != query["session_id"]:
+            return None
+        return {key: self.stored[key] for key, include in projection.items() if include and key in self.stored}
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Stubs the models and the write queue; returns the list of updates the endpoint queued."""
+    queued = []
+
+    async def fake_predict_exercise(user_input):
+        return {"exercise_type": "cardio"}, {"age": user_input.age}
+
+    def fake_enqueue(session_id, update, upsert=False):
+        queued.append((session_id, update, upsert))
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(None)
+        return done
+
+    monkeypatch.setattr(main, "predict_exercise", fake_predict_exercise)
+    monkeypatch.setattr(main, "enqueue_prediction_update", fake_enqueue)
+    return queued
+
+
+def _post_exercise(stored):
+    main.app.state.predictions = FakeCollection(stored)
+    return TestClient(main.app).post("/predict_exercise", json=USER_INPUT)
+
+
+def test_new_session_is_written(writes):
+    assert _post_exercise(None).status_code == 200
+    assert len(writes) == 1 and writes[0][2] is True
+
+
+def test_unchanged_input_is_not_rewritten(writes):
+    stored = {"session_id": "s1", "input_hash": compute_input_hash(USER_INPUT)}
+    assert _post_exercise(stored).status_code == 200
+    assert writes == []
+
+
+def test_changed_input_is_written(writes):
+    stored = {"session_id": "s1", "input_hash": compute_input_hash({**USER_INPUT, "age": 31})}
+    assert _post_exercise(stored).status_code == 200
+    assert len(writes) == 1
+    assert writes[0][1]["$set"]["input_hash"] == compute_input_hash(USER_INPUT)
+
+
+def test_diet_plan_uses_the_stored_record(writes, monkeypatch):
+    seen = []
+
+    async def fake_predict_diet(processed_features, exercise_predictions, raw_user_input):
+        seen.append(processed_features)
+        return {"recommended_calories": 2000.0}
+
+    monkeypatch.setattr(main, "predict_diet", fake_predict_diet)
+    main.app.state.predictions = FakeCollection({
+        "session_id": "s1", "processed_features": {"age": 31}, "exercise_predictions": {"exercise_type": "cardio"},
+        "raw_user_input": USER_INPUT,
+    })
+    client = TestClient(main.app)
+    assert client.post("/predict_diet", json={"session_id": "s1"}).status_code == 200
+    assert seen == [{"age": 31}]
+    assert client.post("/predict_diet", json={"session_id": "missing"}).status_code == 404
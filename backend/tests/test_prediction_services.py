@@ -0,0 +1,50 @@
+# backend/tests/test_prediction_services.py
+import asyncio
+import bson
+
+from models.request_models import UserInput
+from services import diet_service, exercise_service
+
+USER_INPUT = UserInput(
+    session_id="s1", age=30, gender="male", height_value=180, height_unit="cm",
+    weight_value=80, weight_unit="kg", calories_intake=2500
+)
+
+
+def _builtin_types(value) -> set:
+    if isinstance(value, dict):
+        return set().union(*(_builtin_types(v) for v in value.values())) if value else set()
+    return {type(value).__module__}
+
+
+def _predict():
+    async def body():
+        exercise_service.load_exercise_models_sync()
+        diet_service.load_diet_models_sync()
+        exercise_service.exercise_batcher.start()
+        diet_service.diet_batcher.start()
+        try:
+            exercise_predictions, processed_features = await exercise_service.predict_exercise(USER_INPUT)
+            raw_user_input = USER_INPUT.model_dump(mode="json")
+            diet_predictions = await diet_service.predict_diet(processed_features, exercise_predictions, raw_user_input)
+            return exercise_predictions, processed_features, diet_predictions
+        finally:
+            await exercise_service.exercise_batcher.stop()
+            await diet_service.diet_batcher.stop()
+
+    return asyncio.run(body())
+
+
+def test_predictions_are_plain_python_values():
+    # Stored documents and responses are built from these dicts as they are; numpy scalars would
+    # fail BSON encoding, so every value must already be a builtin type.
+    exercise_predictions, processed_features, diet_predictions = _predict()
+    assert set(exercise_predictions) == {
+        "exercise_type", "intensity_level", "frequency_per_week", "duration_minutes", "estimated_calorie_burn"
+    }
+    assert set(diet_predictions) == {
+        "recommended_calories", "protein_grams_per_day", "carbs_grams_per_day", "fats_grams_per_day"
+    }
+    for record in (exercise_predictions, processed_features, diet_predictions):
+        assert _builtin_types(record) == {"builtins"}
+        bson.encode(record)
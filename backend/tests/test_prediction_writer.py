@@ -0,0 +1,79 @@
+# backend/tests/test_prediction_writer.py
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError
+
+from database import mongodb_client, prediction_writer
+
+
+class FakeCollection:
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.batches = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.batches.append(ops)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return type("Result", (), {"upserted_count": 0})()
+
+
+def _run(collection, monkeypatch, body):
+    monkeypatch.setattr(mongodb_client, "predictions_collection", collection)
+
+    async def main():
+        prediction_writer.start_prediction_writer()
+        try:
+            return await body()
+        finally:
+            await prediction_writer.stop_prediction_writer()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_updates_share_one_bulk_write(monkeypatch):
+    collection = FakeCollection()
+
+    async def body():
+        await asyncio.gather(*(
+            prediction_writer.enqueue_prediction_update(f"s{i}", {"$set": {"i": i}}, upsert=True) for i in range(5)
+        ))
+
+    _run(collection, monkeypatch, body)
+    assert [len(batch) for batch in collection.batches] == [5]
+
+
+def test_failed_batch_reaches_every_waiter(monkeypatch):
+    collection = FakeCollection(error=RuntimeError("connection reset"))
+
+    async def body():
+        return await asyncio.gather(*(
+            prediction_writer.enqueue_prediction_update(f"s{i}", {"$set": {"i": i}}) for i in range(3)
+        ), return_exceptions=True)
+
+    results = _run(collection, monkeypatch, body)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_bulk_write_error_fails_only_the_bad_update(monkeypatch):
+    collection = FakeCollection(error=BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "bad update"}]}))
+
+    async def body():
+        return await asyncio.gather(*(
+            prediction_writer.enqueue_prediction_update(f"s{i}", {"$set": {"i": i}}) for i in range(3)
+        ), return_exceptions=True)
+
+    first, second, third = _run(collection, monkeypatch, body)
+    assert first is None and third is None
+    assert isinstance(second, RuntimeError)
+    # The update after the failed one is retried on its own.
+    assert [len(batch) for batch in collection.batches] == [3, 1]
+
+
+def test_update_fails_when_writer_is_not_running():
+    async def body():
+        await prediction_writer.enqueue_prediction_update("s", {"$set": {}})
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(body())
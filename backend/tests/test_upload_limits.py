@@ -0,0 +1,92 @@
+# backend/tests/test_upload_limits.py
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from utils.upload_limits import MULTIPART_OVERHEAD_BYTES, UploadLimitMiddleware, _format_size
+
+MAX_UPLOAD_BYTES = 1024
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, paths=["/upload"], max_upload_bytes=MAX_UPLOAD_BYTES)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def _chunks(data: bytes, size: int = 4096):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_small_upload_passes():
+    response = _client().post("/upload", files={"file": ("dish.jpg", b"x" * 100, "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_non_multipart_is_rejected_with_415():
+    response = _client().post("/upload", json={"file": "dish.jpg"})
+    assert response.status_code == 415
+
+
+def test_invalid_content_length_is_rejected_with_400():
+    response = _client().post(
+        "/upload", content=b"x", headers={"content-type": "multipart/form-data; boundary=b", "content-length": "abc"}
+    )
+    assert response.status_code == 400
+
+
+def test_oversized_content_length_is_rejected_with_413():
+    body = b"x" * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES + 1)
+    response = _client().post("/upload", files={"file": ("dish.jpg", body, "image/jpeg")})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Image is too large. The maximum upload size is 1 KB."}
+
+
+def test_oversized_streamed_body_is_rejected_with_413():
+    body = b"x" * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES + 1)
+    response = _client().post(
+        "/upload", content=_chunks(body), headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+
+
+def test_other_paths_are_not_limited():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, paths=["/upload"], max_upload_bytes=MAX_UPLOAD_BYTES)
+
+    @app.post("/other")
+    async def other(payload: dict):
+        return payload
+
+    response = TestClient(app).post("/other", json={"a": 1})
+    assert response.status_code == 200
+
+
+def test_format_size():
+    assert _format_size(512 * 1024) == "512 KB"
+    assert _format_size(100) == "1 KB"
+    assert _format_size(20 * 1024 * 1024) == "20 MB"
+    assert _format_size(int(1.5 * 1024 * 1024)) == "1.5 MB"
+
+
+def test_rejections_carry_cors_headers():
+    # The app is used without its lifespan, so no models are loaded; the limiter answers before any handler runs.
+    import main
+
+    client = TestClient(main.app)
+    origin = {"origin": "http://localhost:5173"}
+    too_large = b"x" * (main.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES + 1)
+
+    response = client.post("/classify_dish", files={"file": ("dish.jpg", too_large, "image/jpeg")}, headers=origin)
+    assert response.status_code == 413
+    assert "access-control-allow-origin" in response.headers
+
+    response = client.post("/classify_dish", json={}, headers=origin)
+    assert response.status_code == 415
+    assert "access-control-allow-origin" in response.headers
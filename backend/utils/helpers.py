@@ -1,19 +1,12 @@
 # backend/utils/helpers.py
-import numpy as np
-from typing import Any, Dict, List
+import ctypes
+import hashlib
+import orjson
+from typing import Any, Dict
 
-def convert_numpy_types(obj: Any) -> Any:
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {k: convert_numpy_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(elem) for elem in obj]
-    return obj
+def compute_input_hash(obj: Any) -> str:
+    """Returns a short, key-order independent digest of a JSON-serializable object."""
+    return hashlib.blake2b(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
 
 def infer_activity_level(freq: int, intensity: str) -> str:
     if freq >= 5 and intensity.lower() == "high":
@@ -23,4 +16,35 @@ def infer_activity_level(freq: int, intensity: str) -> str:
     elif freq <= 2:
         return "light"
     else:
-        return "sedentary"
\ No newline at end of file
+        return "sedentary"
+
+def build_label_codes(encoders: Dict[str, Any]) -> Dict[str, Dict[Any, int]]:
+    """
+    Returns {encoder name: {class: code}} for a dict of fitted LabelEncoders.
+    A dict lookup replaces LabelEncoder.transform for single values, which pays for input validation and a searchsorted per call.
+    """
+    return {
+        name: {label: code for code, label in enumerate(encoder.classes_.tolist())}
+        for name, encoder in encoders.items() if encoder is not None
+    }
+
+def release_freed_heap() -> None:
+    """
+    Hands heap pages freed after model loading back to the OS (glibc malloc_trim); no-op on other C libraries.
+    onnxruntime frees most of what it allocates while parsing a model, but glibc keeps those pages mapped.
+    """
+    try:
+        libc = ctypes.CDLL("libc.so.6")
+    except OSError:
+        return
+    libc.malloc_trim(0)
+
+def strip_feature_names(model: Any) -> None:
+    """
+    Forgets the column names a model was fitted with, so it can be fed positional ndarrays
+    (in the training column order) without sklearn warning about missing feature names.
+    """
+    if getattr(model, "feature_names_in_", None) is not None:
+        model.feature_names_in_ = None
+    for estimator in getattr(model, "estimators_", None) or []:
+        strip_feature_names(estimator)
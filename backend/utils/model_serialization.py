@@ -0,0 +1,210 @@
+# backend/utils/model_serialization.py
+"""
+Pickle-free storage for the scikit-learn models.
+
+Numeric arrays (tree nodes, leaf values, fitted class labels) are written to a safetensors
+file and the object graph around them is described by a small JSON manifest. Loading only
+ever instantiates classes from the sklearn package, so no pickle opcodes are executed.
+"""
+import os
+import json
+import importlib
+import joblib
+import numpy as np
+import sklearn
+from typing import Any, Dict
+from safetensors.numpy import save_file, load_file
+from sklearn.base import BaseEstimator
+from sklearn.tree._tree import Tree, NODE_DTYPE
+
+FORMAT_VERSION = 1
+TENSORS_SUFFIX = ".safetensors"
+MANIFEST_SUFFIX = ".json"
+PICKLE_SUFFIX = ".pkl"
+ONNX_SUFFIX = ".onnx"
+ORT_SUFFIX = ".ort"
+
+
+class _Writer:
+    """Flattens a fitted model into JSON-safe metadata plus a dict of numpy tensors."""
+
+    def __init__(self):
+        self.tensors: Dict[str, np.ndarray] = {}
+        # All trees share one tensor per node field so the file holds a handful of large arrays.
+        self.node_fields: Dict[str, list] = {name: [] for name in NODE_DTYPE.names}
+        self.values: list = []
+        self.node_offset = 0
+        self.value_offset = 0
+
+    def encode(self, obj: Any) -> Any:
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        if isinstance(obj, np.generic):
+            return {"__scalar__": obj.item(), "dtype": obj.dtype.str}
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == object or obj.dtype.kind == "U":
+                return {"__strings__": obj.tolist(), "dtype": obj.dtype.str}
+            key = f"array.{len(self.tensors)}"
+            self.tensors[key] = np.ascontiguousarray(obj)
+            return {"__tensor__": key}
+        if isinstance(obj, list):
+            return [self.encode(v) for v in obj]
+        if isinstance(obj, tuple):
+            return {"__tuple__": [self.encode(v) for v in obj]}
+        if isinstance(obj, dict):
+            return {"__dict__": {str(k): self.encode(v) for k, v in obj.items()}}
+        if isinstance(obj, Tree):
+            return self._encode_tree(obj)
+        if isinstance(obj, BaseEstimator):
+            cls = type(obj)
+            return {
+                "__estimator__": f"{cls.__module__}.{cls.__qualname__}",
+                "state": {k: self.encode(v) for k, v in vars(obj).items()}
+            }
+        raise TypeError(f"Cannot serialize object of type {type(obj).__name__}.")
+
+    def _encode_tree(self, tree: Tree) -> Dict[str, Any]:
+        state = tree.__getstate__()
+        nodes, values = state["nodes"], state["values"]
+        for name in NODE_DTYPE.names:
+            self.node_fields[name].append(nodes[name])
+        self.values.append(values.ravel())
+
+        encoded = {"__tree__": {
+            "n_features": int(tree.n_features),
+            "n_classes": [int(c) for c in tree.n_classes],
+            "n_outputs": int(tree.n_outputs),
+            "max_depth": int(state["max_depth"]),
+            "node_count": int(state["node_count"]),
+            "node_offset": self.node_offset,
+            "value_offset": self.value_offset,
+            "value_shape": list(values.shape)
+        }}
+        self.node_offset += len(nodes)
+        self.value_offset += values.size
+        return encoded
+
+    def finalize(self) -> Dict[str, np.ndarray]:
+        if self.values:
+            for name, parts in self.node_fields.items():
+                self.tensors[f"tree.{name}"] = np.ascontiguousarray(np.concatenate(parts))
+            self.tensors["tree.values"] = np.ascontiguousarray(np.concatenate(self.values))
+        return self.tensors
+
+
+class _Reader:
+    """Rebuilds a model from its manifest and the tensors loaded from safetensors."""
+
+    def __init__(self, tensors: Dict[str, np.ndarray]):
+        self.tensors = tensors
+
+    def decode(self, enc: Any) -> Any:
+        if isinstance(enc, list):
+            return [self.decode(v) for v in enc]
+        if not isinstance(enc, dict):
+            return enc
+        if "__scalar__" in enc:
+            return np.dtype(enc["dtype"]).type(enc["__scalar__"])
+        if "__strings__" in enc:
+            return np.array(enc["__strings__"], dtype=np.dtype(enc["dtype"]))
+        if "__tensor__" in enc:
+            return self.tensors[enc["__tensor__"]]
+        if "__tuple__" in enc:
+            return tuple(self.decode(v) for v in enc["__tuple__"])
+        if "__dict__" in enc:
+            return {k: self.decode(v) for k, v in enc["__dict__"].items()}
+        if "__tree__" in enc:
+            return self._decode_tree(enc["__tree__"])
+        if "__estimator__" in enc:
+            cls = _resolve_estimator_class(enc["__estimator__"])
+            estimator = cls.__new__(cls)
+            estimator.__dict__.update({k: self.decode(v) for k, v in enc["state"].items()})
+            return estimator
+        raise ValueError(f"Unrecognized entry in model manifest: {list(enc)}")
+
+    def _decode_tree(self, meta: Dict[str, Any]) -> Tree:
+        tree = Tree(meta["n_features"], np.asarray(meta["n_classes"], dtype=np.intp), meta["n_outputs"])
+
+        start, count = meta["node_offset"], meta["node_count"]
+        nodes = np.empty(count, dtype=NODE_DTYPE)
+        for name in NODE_DTYPE.names:
+            nodes[name] = self.tensors[f"tree.{name}"][start:start + count]
+
+        value_start = meta["value_offset"]
+        value_shape = meta["value_shape"]
+        values = self.tensors["tree.values"][value_start:value_start + int(np.prod(value_shape))]
+
+        tree.__setstate__({
+            "max_depth": meta["max_depth"],
+            "node_count": count,
+            "nodes": nodes,
+            "values": np.ascontiguousarray(values.reshape(value_shape))
+        })
+        return tree
+
+
+def _resolve_estimator_class(path: str) -> type:
+    module_name, _, class_name = path.rpartition(".")
+    if module_name != "sklearn" and not module_name.startswith("sklearn."):
+        raise ValueError(f"Refusing to load non-sklearn class '{path}' from model manifest.")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    if not isinstance(cls, type) or not issubclass(cls, BaseEstimator):
+        raise ValueError(f"'{path}' is not a scikit-learn estimator class.")
+    return cls
+
+
+def save_model(model: Any, path_stem: str) -> None:
+    """Writes `model` to `<path_stem>.safetensors` plus a `<path_stem>.json` manifest."""
+    writer = _Writer()
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "root": writer.encode(model)
+    }
+    save_file(writer.finalize(), path_stem + TENSORS_SUFFIX)
+    with open(path_stem + MANIFEST_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def load_model(path_stem: str) -> Any:
+    """Rebuilds a model written by `save_model`."""
+    with open(path_stem + MANIFEST_SUFFIX, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model manifest version in {path_stem + MANIFEST_SUFFIX}.")
+    if manifest.get("sklearn_version") != sklearn.__version__:
+        print(f"Warning: {path_stem} was exported with scikit-learn {manifest.get('sklearn_version')}, running {sklearn.__version__}.")
+
+    return _Reader(load_file(path_stem + TENSORS_SUFFIX)).decode(manifest["root"])
+
+
+def model_artifact_path(models_path: str, name: str) -> str:
+    """
+    Returns the file load_model_artifact reads for the model `name`: the ORT-format or ONNX export
+    (see scripts/export_sklearn_onnx.py) if present, then the safetensors export, then the joblib pickle.
+    """
+    path_stem = os.path.join(models_path, name)
+    if os.path.exists(path_stem + ORT_SUFFIX):
+        return path_stem + ORT_SUFFIX
+    if os.path.exists(path_stem + ONNX_SUFFIX):
+        return path_stem + ONNX_SUFFIX
+    if os.path.exists(path_stem + TENSORS_SUFFIX) and os.path.exists(path_stem + MANIFEST_SUFFIX):
+        return path_stem + TENSORS_SUFFIX
+    return path_stem + PICKLE_SUFFIX
+
+
+def load_model_artifact(models_path: str, name: str) -> Any:
+    """
+    Loads the model `name` from `models_path`, preferring the ORT/ONNX export, then the safetensors
+    export, and falling back to the joblib pickle when no export is present.
+    """
+    artifact_path = model_artifact_path(models_path, name)
+    path_stem, suffix = os.path.splitext(artifact_path)
+    if suffix in (ORT_SUFFIX, ONNX_SUFFIX):
+        # Imported lazily so onnxruntime is only loaded when an export is actually served.
+        from utils.onnx_model import OnnxTreeModel
+        return OnnxTreeModel(artifact_path)
+    if suffix == TENSORS_SUFFIX:
+        return load_model(path_stem)
+    return joblib.load(artifact_path)
@@ -0,0 +1,89 @@
+# backend/utils/upload_limits.py
+"""
+Rejects bad image uploads before FastAPI parses the multipart body.
+
+Written as plain ASGI middleware rather than BaseHTTPMiddleware so it adds no extra task per request
+and can stop a body that is streamed without a Content-Length as soon as it passes the limit.
+"""
+from typing import Iterable
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+def _format_size(num_bytes: int) -> str:
+    """Formats a byte count as KB below 1 MB and as MB with at most one decimal above it."""
+    if num_bytes < 1024 * 1024:
+        return f"{max(1, round(num_bytes / 1024))} KB"
+    return f"{round(num_bytes / (1024 * 1024), 1):g} MB"
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_upload_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_upload_bytes = max_upload_bytes
+        self.max_body_bytes = max_upload_bytes + MULTIPART_OVERHEAD_BYTES
+
+    def _too_large(self) -> ORJSONResponse:
+        return ORJSONResponse(
+            status_code=413,
+            content={"detail": f"Image is too large. The maximum upload size is {_format_size(self.max_upload_bytes)}."},
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            response = ORJSONResponse(status_code=415, content={"detail": "Invalid request. Please upload the image as multipart/form-data."})
+            await response(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                await ORJSONResponse(status_code=400, content={"detail": "Invalid Content-Length header."})(scope, receive, send)
+                return
+            if int(content_length) > self.max_body_bytes:
+                await self._too_large()(scope, receive, send)
+                return
+
+        received = 0
+        too_large = False
+        rejection_sent = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    too_large = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def limited_send(message: Message):
+            nonlocal rejection_sent
+            if not too_large:
+                await send(message)
+            elif message["type"] == "http.response.start" and not rejection_sent:
+                # FastAPI turns the aborted body read into its own error response; answer 413 instead.
+                rejection_sent = True
+                await self._too_large()(scope, receive, send)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except _BodyTooLarge:
+            pass
+        if too_large and not rejection_sent:
+            await self._too_large()(scope, receive, send)